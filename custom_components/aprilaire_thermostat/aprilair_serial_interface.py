@@ -1,41 +1,219 @@
 
 import logging
 import asyncio
+import random
+import re
+import time
+from collections import deque
 from serial_asyncio import open_serial_connection
 
-from homeassistant.components.climate.const import (
-    HVACMode, HVACAction
+from .metrics import BusMetrics
+from .transport import READ_CHUNK, is_tcp_url, is_tty_url, open_tcp_connection, open_tty_connection
+from .protocol import (
+    FAN_ECHO, FAN_ENCODE, MODE_ECHO, MODE_ENCODE, TERMINATOR, HVACMode, ReplyParser, encode, parse_line
 )
 
 _LOGGER = logging.getLogger(__name__)
 
+ADDRESS_RE = re.compile(r"SN\d+")
+ADDRESS_FIELD_RE = re.compile(r"\s*(SN\d+)\s*(?:([A-Z]+)\s*[?=])?")
+# Coordinator snapshot key for each field that can arrive as a status line
+UPDATE_FIELDS = {
+    "T": "temperature",
+    "SH": "setpoint_heat",
+    "SC": "setpoint_cool",
+    "M": "mode",
+    "H": "action",
+    "F": "fan",
+}
+SETPOINT_FIELDS = {HVACMode.HEAT: "SH", HVACMode.COOL: "SC"}
+
+# Seconds a reply stays cached per field; None caches until invalidated.
+# T (temperature) and H (relay state) change all the time and are never cached.
+DEFAULT_CACHE_TTL = {
+    "NAME": None,
+    "SH": 30,
+    "SC": 30,
+    "M": 30,
+    "F": 30,
+}
+
+# A write waits this long (seconds) for newer values of the same field, so a
+# dragged slider becomes one command carrying the last value
+WRITE_DEBOUNCE = 0.25
+WRITE_RETRIES = 1  # times a write is resent when the device does not confirm it
+
+# Reply timeouts (seconds) follow the reply times measured on the bus. Before
+# anything was measured the hand-picked defaults apply; replies that end when
+# the bus goes idle (discovery, legacy mode) never wait less than MIN_IDLE_TIMEOUT.
+DEFAULT_REPLY_TIMEOUT = 0.25
+DEFAULT_IDLE_TIMEOUT = 0.5
+MIN_REPLY_TIMEOUT = 0.1  # headroom for event loop stalls
+MIN_IDLE_TIMEOUT = 0.25
+MAX_REPLY_TIMEOUT = 2.0
+READ_RETRIES = 2  # times a read that got no reply is sent again, with the timeout doubled
+
+# Scheduling classes, highest priority first
+PRIORITY_WRITE = 0   # user initiated changes
+PRIORITY_VERIFY = 1  # read-back after a write
+PRIORITY_POLL = 2    # background polling
+
+# Connection health: probe an idle bus this often, and reconnect with jittered
+# exponential backoff between RECONNECT_MIN_DELAY and RECONNECT_MAX_DELAY seconds
+HEARTBEAT_INTERVAL = 30
+MAX_MISSED_BATCHES = 3  # batches in a row without any reply before the link is probed
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30
+
+
+def split_address_field(text):
+    """Return the (address, field) a command or reply refers to, e.g. ("SN1", "SH")."""
+    match = ADDRESS_FIELD_RE.match(text)
+    if not match:
+        return (None, None)
+    return match.group(1), match.group(2)
+
+
 class AprilaireThermostatSerialInterface:
-    def __init__(self, port="/dev/ttyUSB0", baudrate=9600):
+    def __init__(self, port="/dev/ttyUSB0", baudrate=9600, framed=True, pipeline_depth=8, push=False,
+                 cache_ttl=None, write_debounce=WRITE_DEBOUNCE):
         self.port = port
         self.baudrate = baudrate
         self.reader = None
         self.writer = None
+        self.framed = framed  # end single-line replies on the terminator instead of the idle timeout
+        self.pipeline_depth = pipeline_depth  # commands written before waiting for replies
         self._readwrite_lock = asyncio.Lock()  # prevent read write pairs overlapping
+        # Per priority class: address -> (command, timeout, future, queued at, timed) waiting for the next batch
+        self._queues = [{} for _ in (PRIORITY_WRITE, PRIORITY_VERIFY, PRIORITY_POLL)]
+        self._flusher = None
+        self._pending = {}  # address -> [(field, future, command to time or None)] for the batch in flight
+        self._reply_mark = 0.0  # perf_counter of the batch write or the last reply to it
+        self._unanswered = set()  # addresses whose last read got no reply, even after retries
+        self.push = push  # keep a reader running for unsolicited status lines
+        self._listener_task = None
+        self._listeners = []
+        self._collector = None  # unmatched lines while a multi-line reply is being collected
+        self.cache_ttl = {**DEFAULT_CACHE_TTL, **(cache_ttl or {})}
+        self._cache = {}  # (address, field) -> (expires, reply)
+        self.write_debounce = write_debounce
+        self._writes = {}  # (address, field) -> [value, expected echo, future, task] not yet sent
+        self.metrics = BusMetrics()
+        self.connected = False
+        self.thermostats = []  # addresses from discovery or the coordinator, used for heartbeats
+        self._connection_listeners = []
+        self._monitor_task = None
+        self._wake_monitor = asyncio.Event()
+        self._last_activity = 0.0  # loop time of the last line received
+        self._missed_batches = 0
 
     async def connect(self):
-        """Establish a non-blocking serial connection."""
+        """Establish a non-blocking serial connection; tcp:// and tty:// ports use our own transports."""
         try:
-            self.reader, self.writer = await open_serial_connection(
-                url=self.port, baudrate=self.baudrate
-            )
+            if is_tcp_url(self.port):
+                reader, writer = await open_tcp_connection(self.port)
+            elif is_tty_url(self.port):
+                reader, writer = await open_tty_connection(self.port, self.baudrate)
+            else:
+                reader, writer = await open_serial_connection(
+                    url=self.port, baudrate=self.baudrate
+                )
             #_LOGGER.info(f"Serial connection established on {self.port}")
         except Exception as e:
             _LOGGER.error(f"Failed to connect to serial device: {e}")
             raise
+        self.attach(reader, writer)
+
+    def attach(self, reader, writer):
+        """Start using an already open stream pair, e.g. from the simulator."""
+        self.reader, self.writer = reader, writer
+        self._last_activity = asyncio.get_running_loop().time()
+        self._missed_batches = 0
+        if self.push:
+            self._listener_task = asyncio.get_running_loop().create_task(self._listen())
+        self._set_connected(True)
     
     
     async def check_connection(self):
-        """Check if the serial connection is still active."""
-        if not self.writer or not self.reader:
-            _LOGGER.error("No active serial connection to check")
+        """Check if the serial connection is still active, probing the bus if it has been quiet."""
+        if not self.writer or not self.reader or not self.connected:
             return False
-        # FIX-THIS!!!
-        return True
+        if asyncio.get_running_loop().time() - self._last_activity < HEARTBEAT_INTERVAL:
+            return True
+        return await self._probe()
+
+    def add_connection_listener(self, listener):
+        """Call listener(connected) whenever the connection goes up or down; returns a remover."""
+        self._connection_listeners.append(listener)
+        return lambda: self._connection_listeners.remove(listener)
+
+    def _set_connected(self, connected):
+        if connected == self.connected:
+            return
+        self.connected = connected
+        for listener in list(self._connection_listeners):
+            try:
+                listener(connected)
+            except Exception as e:
+                _LOGGER.error(f"Error in connection listener: {e}")
+
+    def _connection_lost(self, error):
+        """Note a failed read or write and let the monitor check the link right away."""
+        _LOGGER.debug(f"Serial connection problem: {error}")
+        self._missed_batches = MAX_MISSED_BATCHES
+        self._wake_monitor.set()
+
+    def start_monitor(self):
+        """Start checking the link in the background and reconnecting when it drops."""
+        if self._monitor_task is None or self._monitor_task.done():
+            self._monitor_task = asyncio.get_running_loop().create_task(self._monitor())
+
+    async def _monitor(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake_monitor.wait(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake_monitor.clear()
+
+            if self.connected:
+                suspect = self._missed_batches >= MAX_MISSED_BATCHES or not self.reader or self.reader.at_eof()
+                if not suspect:
+                    # Recent replies prove the link is up; check_connection only probes a quiet bus
+                    busy = any(self._queues) or self._readwrite_lock.locked()
+                    if busy or await self.check_connection():
+                        continue
+                elif await self._probe():
+                    continue
+
+            _LOGGER.warning(f"Lost connection to {self.port}, reconnecting")
+            self._set_connected(False)
+            await self._reconnect()
+
+    async def _probe(self):
+        """Send one cheap command and report whether anything answered."""
+        if self.thermostats:
+            response = await self.command_response(f"{self.thermostats[0]}T?", priority=PRIORITY_VERIFY)
+        else:
+            response = await self.command_response("SN?#", multiline=True)
+        if response:
+            self._missed_batches = 0
+        return bool(response)
+
+    async def _reconnect(self):
+        """Reopen the port until it works, backing off with jitter between attempts."""
+        attempt = 0
+        while True:
+            self._close_streams()
+            try:
+                await self.connect()
+                _LOGGER.info(f"Reconnected to {self.port}")
+                return
+            except Exception:
+                pass
+            delay = min(RECONNECT_MAX_DELAY, RECONNECT_MIN_DELAY * 2 ** attempt)
+            attempt += 1
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
 
     async def send_command(self, command):
         """Send a command over the serial connection."""
@@ -48,6 +226,7 @@ class AprilaireThermostatSerialInterface:
             _LOGGER.debug(f"Command sent: {command}")
         except Exception as e:
             _LOGGER.error(f"Error sending command '{command}': {e}")
+            self._connection_lost(e)
 
     async def read_response(self, timeout=0.25):
         """Read the response asynchronously with a timeout and lock."""
@@ -55,140 +234,521 @@ class AprilaireThermostatSerialInterface:
             _LOGGER.error("Attempted to read response without an active connection")
             return ""
         
-        response = ""
+        # Lines are split out of one buffer as they complete instead of concatenating text
+        parser = ReplyParser()
+        lines = []
         try:
             while True:
                 # Wait up to 'timeout' seconds for each read operation
-                data = await asyncio.wait_for(self.reader.read(50), timeout)
+                data = await asyncio.wait_for(self.reader.read(READ_CHUNK), timeout)
                 if not data:
                     break
-                response += data.decode('utf-8')
+                lines += parser.feed(data)
         except asyncio.TimeoutError:
             None
             #_LOGGER.warning("Timeout reached while reading response")
         except Exception as e:
             _LOGGER.error(f"Error reading response: {e}")
 
-        return response.strip()
-    
-    async def command_response(self, command, timeout=0.25):
+        lines += parser.flush()
+        return "\r".join(text for text, _ in lines)
+
+    async def read_line(self, timeout=0.25):
+        """Read one terminated reply line, using the timeout only as a safety net.
+
+        Returns None when nothing arrives in time or the connection is closed.
+        """
+        if not self.reader:
+            _LOGGER.error("Attempted to read response without an active connection")
+            return None
+        try:
+            data = await asyncio.wait_for(self.reader.readuntil(TERMINATOR), timeout)
+        except asyncio.TimeoutError:
+            return None
+        except asyncio.IncompleteReadError as e:
+            data = e.partial  # connection closed mid-reply
+            self._connection_lost(e)
+            if not data:
+                return None
+        except Exception as e:
+            _LOGGER.error(f"Error reading response: {e}")
+            self._connection_lost(e)
+            return None
+        self._last_activity = asyncio.get_running_loop().time()
+        return data.decode('utf-8', errors='replace').strip()
+
+    async def command_response(self, command, timeout=None, multiline=False, priority=PRIORITY_POLL,
+                               force=False):
+        """Send a command and return its reply, answering cached reads unless force is set.
+
+        The timeout defaults to one derived from measured reply times (see reply_timeout).
+        Reads are safe to repeat, so one that gets no reply is sent again up to READ_RETRIES
+        times; writes are only repeated by _write_verified, after reading the value back.
+        A thermostat that stayed silent last time is not retried until it answers again,
+        so a missing one does not hold up the bus.
+        """
+        key = split_address_field(command)
+        if not force and command.endswith("?"):
+            cached = self._cache.get(key)
+            if cached and cached[0] > asyncio.get_running_loop().time():
+                self.metrics.cache_hits += 1
+                return cached[1]
+
+        address = key[0]
+        retries = READ_RETRIES if "=" not in command and address not in self._unanswered else 0
+        timeout = timeout or self.reply_timeout(command, multiline)
+        start = time.perf_counter()
+        for attempt in range(retries + 1):
+            # A retried command's reply may be the late one to the first attempt, so it is not timed
+            response = await self._exchange(command, timeout, multiline, priority, attempt == 0)
+            if response or attempt == retries or not self.connected:
+                break
+            self.metrics.read_retries += 1
+            timeout = min(MAX_REPLY_TIMEOUT, timeout * 2)
+            _LOGGER.debug(f"ASI: No reply to {command}, retrying with a {timeout:.2f}s timeout")
+        if address and "=" not in command:
+            if response:
+                self._unanswered.discard(address)
+            else:
+                self._unanswered.add(address)
+        self.metrics.record_command(command, time.perf_counter() - start, response)
+        if key[1] in self.cache_ttl:
+            # A write's echo is the same line a read returns, so it refreshes the entry too
+            reply = parse_line(response) if response else None
+            if reply and (reply.address, reply.field) == key:
+                self._cache_store(key, response)
+            else:
+                self.invalidate(*key)
+        return response
+
+    def reply_timeout(self, command, multiline=False):
+        """Return how long to wait for a reply to command.
+
+        Like TCP's retransmission timeout this is the smoothed reply time plus four
+        mean deviations, for the command type or else for the whole bus.
+        """
+        estimate = self.metrics.rtt_timeout(command)
+        if multiline or not self.framed:
+            if estimate is None:
+                return DEFAULT_IDLE_TIMEOUT
+            return min(MAX_REPLY_TIMEOUT, max(MIN_IDLE_TIMEOUT, estimate))
+        if estimate is None:
+            return DEFAULT_REPLY_TIMEOUT
+        return min(MAX_REPLY_TIMEOUT, max(MIN_REPLY_TIMEOUT, estimate))
+
+    def _cache_store(self, key, response):
+        ttl = self.cache_ttl[key[1]]
+        expires = float("inf") if ttl is None else asyncio.get_running_loop().time() + ttl
+        self._cache[key] = (expires, response)
+
+    def confirmed_value(self, sn, field):
+        """Return the value the device last reported for a field, if the cache still holds it."""
+        cached = self._cache.get((sn, field))
+        if not cached or cached[0] <= asyncio.get_running_loop().time():
+            return None
+        reply = parse_line(cached[1])
+        return reply.value if reply and reply.field == field else None
+
+    def invalidate(self, sn=None, field=None):
+        """Drop cached replies, for one thermostat and/or field or all of them."""
+        for key in [k for k in self._cache if sn in (None, k[0]) and field in (None, k[1])]:
+            del self._cache[key]
+
+    async def _exchange(self, command, timeout, multiline, priority, timed=True):
+        if not self.connected:
+            # Fail fast instead of queueing behind a reconnect
+            return ""
+        if self.framed and not multiline:
+            return (await self.transaction([command], timeout, priority, timed))[0]
+
+        start = time.perf_counter()
         async with self._readwrite_lock:  # Lock to prevent multiple concurrent reads/writes
+            self.metrics.record_queue_wait(time.perf_counter() - start)
+            if self.listening:
+                # The listener owns the reader; collect what it does not match
+                self._collector = []
+                await self.send_command(command)
+                await self._wait_idle(timeout)
+                response = "\r".join(self._collector)
+                self._collector = None
+                return response
             await self.send_command(command)
+            # The number of reply lines is unknown, so wait for the bus to go idle
             response = await self.read_response(timeout)
+        if not response:
+            self.metrics.record_timeout(command)
         return response
 
+    async def _wait_idle(self, timeout):
+        """Wait until the listener has collected nothing new for timeout seconds."""
+        while True:
+            count = len(self._collector)
+            await asyncio.sleep(timeout)
+            if len(self._collector) == count:
+                return
+
+    async def transaction(self, commands, timeout=None, priority=PRIORITY_POLL, timed=True):
+        """Send commands pipelined and return their replies in the same order.
+
+        Commands from concurrent callers are queued and written together, up
+        to pipeline_depth at a time, so the bus is not limited to one request
+        in flight. A missing reply comes back as an empty string. Reply times
+        feed the timeout estimate unless timed is False.
+        """
+        if not self.connected:
+            return [""] * len(commands)
+        loop = asyncio.get_running_loop()
+        queue = self._queues[priority]
+        futures = []
+        for command in commands:
+            future = loop.create_future()
+            address, _ = split_address_field(command)
+            queue.setdefault(address, deque()).append(
+                (command, timeout or self.reply_timeout(command), future, time.perf_counter(), timed)
+            )
+            futures.append(future)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self._flush_queue())
+        return await asyncio.gather(*futures)
+
+    def _next_batch(self):
+        """Take the next batch by priority class, round-robin across thermostats within a class."""
+        batch = []
+        for queue in self._queues:
+            while queue and len(batch) < self.pipeline_depth:
+                address = next(iter(queue))
+                waiting = queue.pop(address)
+                batch.append(waiting.popleft())
+                if waiting:
+                    queue[address] = waiting  # back of the line
+        return batch
+
+    async def _flush_queue(self):
+        try:
+            async with self._readwrite_lock:
+                while any(self._queues):
+                    batch = self._next_batch()
+                    try:
+                        await self._run_batch(batch)
+                    except Exception as e:
+                        _LOGGER.error(f"Error running pipelined commands: {e}")
+                        self._connection_lost(e)
+                    finally:
+                        # Every command of the batch gets an answer, even if the flusher is stopped
+                        answered = self._settle_batch(batch)
+                    if answered:
+                        self._missed_batches = 0
+                    else:
+                        self._missed_batches += 1
+                        if self._missed_batches >= MAX_MISSED_BATCHES:
+                            self._wake_monitor.set()
+        except Exception as e:
+            _LOGGER.error(f"Pipelined command flusher failed: {e}")
+        finally:
+            task = asyncio.current_task()
+            if self._flusher is task:
+                self._flusher = None
+                # Commands queued meanwhile must not be left waiting for a flusher that is gone;
+                # close() empties the queues before cancelling, so this is only a failure
+                if any(self._queues) and not task.cancelling():
+                    self._flusher = asyncio.get_running_loop().create_task(self._flush_queue())
+
+    def _settle_batch(self, batch):
+        """Give unanswered commands of a batch an empty reply; returns True if any was answered."""
+        answered = False
+        for command, _, future, _, _ in batch:
+            if not future.done():
+                self.metrics.record_timeout(command)
+                future.set_result("")
+            elif not future.cancelled() and future.result():
+                # A caller that gave up cancels its future; that is no answer, and no error
+                answered = True
+        return answered
+
+    async def _run_batch(self, batch):
+        """Write a batch in one drain and hand each reply to its command by address and field."""
+        if not self.writer:
+            _LOGGER.error("Attempted to send command without an active connection")
+            return
+
+        now = time.perf_counter()
+        for command, _, future, queued, timed in batch:
+            address, field = split_address_field(command)
+            self._pending.setdefault(address, []).append((field, future, command if timed else None))
+            self.metrics.record_queue_wait(now - queued)
+        futures = {future for _, _, future, _, _ in batch}
+        # Every reply must follow the previous one within the timeout
+        timeout = max(t for _, t, _, _, _ in batch)
+
+        try:
+            self.writer.write(b"".join(f"{command}\r".encode('utf-8') for command, _, _, _, _ in batch))
+            await self.writer.drain()
+            self._reply_mark = time.perf_counter()
+            _LOGGER.debug(f"Commands sent: {[command for command, _, _, _, _ in batch]}")
+
+            if self.listening:
+                while futures:
+                    done, futures = await asyncio.wait(futures, timeout=timeout)
+                    if not done:
+                        break
+                return
+
+            while any(not future.done() for future in futures):
+                response = await self.read_line(timeout)
+                if response is None:
+                    break
+                if response:
+                    self._dispatch_line(response)
+        finally:
+            self._pending.clear()
+
+    def _dispatch_line(self, response):
+        """Hand a reply to the command waiting for it, or treat it as an unsolicited update."""
+        reply = parse_line(response)
+        address, field = (reply.address, reply.field) if reply else (None, None)
+        waiting = self._pending.get(address, [])
+        # Replies are matched on field; a bare address answers a NAME? for an unnamed thermostat
+        index = next((i for i, (f, _, _) in enumerate(waiting) if f == (field or "NAME")), None)
+        if index is not None:
+            _, future, timed = waiting.pop(index)
+            # Time the gap since the write or the previous reply, which is what the timeout bounds
+            now = time.perf_counter()
+            if timed:
+                self.metrics.record_rtt(timed, now - self._reply_mark)
+            self._reply_mark = now
+            if not future.done():
+                future.set_result(response)
+            return
+
+        if self._collector is not None:
+            self._collector.append(response)
+        update = self.decode_update(response)
+        if update:
+            _LOGGER.debug(f"Unsolicited update {response}")
+            self.metrics.unsolicited += 1
+            if field in self.cache_ttl:
+                self._cache_store((address, field), response)
+            self._notify(update, response)
+        else:
+            # Late reply to an earlier, timed out command
+            _LOGGER.debug(f"Dropping unexpected reply {response}")
+
+    def _notify(self, update, response):
+        for listener in list(self._listeners):
+            try:
+                listener(*update)
+            except Exception as e:
+                _LOGGER.error(f"Error in update listener for {response}: {e}")
+
+    @property
+    def listening(self):
+        """Return True while the push listener owns the reader."""
+        return self._listener_task is not None and not self._listener_task.done()
+
+    def add_listener(self, listener):
+        """Call listener(sn, field, value) for status lines nobody asked for and for the
+        state a write left the thermostat in; returns a remover."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    async def _listen(self):
+        """Read every line off the bus and dispatch it, for as long as the connection is open."""
+        while True:
+            response = await self.read_line(None)
+            if response is None:
+                # Closed or failed; the monitor reconnects and starts a new listener
+                _LOGGER.error("Serial connection closed, stopping listener")
+                self._connection_lost("end of stream")
+                return
+            if response:
+                self._dispatch_line(response)
+
+    def decode_update(self, response):
+        """Turn a status line into (sn, field, value) using the coordinator's field names."""
+        reply = parse_line(response)
+        if not reply or reply.value is None or reply.field not in UPDATE_FIELDS:
+            return None
+        return (reply.address, UPDATE_FIELDS[reply.field], reply.value)
+
     async def query_thermostats(self):
         """Query all connected thermostats."""
-        response = await self.command_response("SN?#", 0.5)
-        thermostats = [line for line in response.split("\r") if line.startswith("SN")]
-
-        await asyncio.sleep(0.5)
-        names = []
-        for sn in thermostats:
-            nm = await self.get_name(sn)
-            names.append(nm)
+        response = await self.command_response("SN?#", multiline=True)
+        thermostats = [line.strip() for line in response.split("\r") if ADDRESS_RE.fullmatch(line.strip())]
+        if thermostats:
+            self.thermostats = thermostats
+
+        # Names are read concurrently so they go out as one pipelined batch
+        names = list(await asyncio.gather(*(self.get_name(sn) for sn in thermostats)))
         #_LOGGER.info(f"ASI: Thermostats found: {thermostats} named {names}")
         return (thermostats, names)
 
     async def get_temperature(self, sn):
         """Get the current temperature for a specific thermostat."""
-        response = await self.command_response(f"{sn}T?")
-        # Parse temperature from the response (assuming format is T=XX.X)
-        if "T=" in response:
-            temp = response.split("T=")[1].replace("F","")
-            #_LOGGER.info(f"ASI: Temperature for {sn}: {temp}°F")
-            try:
-                return float(temp)
-            except:
-                _LOGGER.error(f"ASI: {temp} is not a valid temprature")
-        else:
-            _LOGGER.error(f"ASI: For temprature got from {response}")
-        _LOGGER.error(f"ASI: No temperature data received for {sn}.")
-        return None
-    
-    async def get_name(self, sn):
-        response = await self.command_response(f"{sn}NAME?")
-        
+        return self._decode(await self.command_response(encode(sn, "T")), sn, "T", "temperature")
+
+    def _decode(self, response, sn, field, what):
+        """Return the value of a reply to a read of field, or None (logged) if there is none."""
+        reply = parse_line(response)
+        if reply and reply.field == field and reply.value is not None:
+            return reply.value
         if response:
-            return response[3:]  #Skip SN#
+            _LOGGER.error(f"ASI: For {what} of {sn} got {response}")
+            self.metrics.record_parse_failure(f"{field}?")
         else:
-            return None
-    
+            _LOGGER.error(f"ASI: No {what} data received for {sn}.")
+        return None
+
+    async def get_name(self, sn, force=False):
+        response = await self.command_response(encode(sn, "NAME"), force=force)
+        reply = parse_line(response)
+        # A bare address is a thermostat without a name
+        if reply and reply.field in ("NAME", None):
+            return reply.value or ""
+        return None
+
     def state2action(self, state):
         # the State is G?Y1?W1?Y2?W2?B+O-   ? is either + or -
         # Assuming G is for the fan, W1 for 1st stage heat (W2 for 2nd stage?)
         # Y1 is for cool (Y2?)  Not sure what B and O are (B s always seems to be + and O -)
-        try:
-            if state[state.find("W1")+2] == "+":
-                return HVACAction.HEATING
-            elif state[state.find("Y1")+2] == "+":
-                return HVACAction.COOLING
-            elif state[state.find("G")+1] == "+":
-                return HVACAction.FAN
-            else:
-                return HVACAction.OFF
-        except:
-            _LOGGER.error(f"Could not convert {state} to action ")
-            return None
-        
+        reply = parse_line(state)
+        if reply and reply.field == "H":
+            return reply.value
+        _LOGGER.error(f"Could not convert {state} to action ")
+        self.metrics.record_parse_failure("H?")
+        return None
+
     async def get_state(self, sn):
-        response = await self.command_response(f"{sn}H?")        
+        response = await self.command_response(encode(sn, "H"))
         if response:
             return self.state2action(response)
         else:
             return None
 
-    mode_convert_to = {
-        HVACMode.COOL : "C",
-        HVACMode.HEAT : "H",
-        HVACMode.OFF : "OFF",
-        HVACMode.HEAT_COOL : "A",
-        HVACMode.FAN_ONLY : "OFF"  # NO Heat or Cool when Fan only
-    }
-    mode_convert_ret = {
-        HVACMode.FAN_ONLY: "OFF",  # No Heat or Cool when Fan only First, so will not be left in mode_convert_from
-        HVACMode.COOL : "COOL",
-        HVACMode.HEAT : "HEAT",
-        HVACMode.OFF : "OFF",
-        HVACMode.HEAT_COOL: "AUTO",
-    }
-    mode_convert_from = {v: k for k,v in mode_convert_ret.items()}
-        
-    async def get_mode(self, sn):
-        response = await self.command_response(f"{sn}M?")
-        # Parse M=<mode>
-        if "M=" in response:
-            line = response.split("M=")[1]
-            mode = self.mode_convert_from.get(line, None)
-            if mode:
-                # We are no longer doing the fan here!
-                # if mode == HVACMode.OFF:  # Check if fan is on
-                #     response2 = await self.command_response(f"{sn}F?")
-                #     line2 = response2.split("F=")[1]
-                #     if line2 == "AUTO":
-                #         return mode
-                #     elif line2 == "ON":
-                #         return HVACMode.FAN_ONLY
-                #     else:
-                #         _LOGGER.error(f"ASI: Fan check got {line2} from {response2} for mode for {sn}")
-                return mode
-            _LOGGER.error(f"ASI: Got {line} from {response} for mode for {sn}")
+    async def get_mode(self, sn, force=False):
+        response = await self.command_response(encode(sn, "M"), force=force)
+        # We are no longer doing the fan here!
+        # if mode == HVACMode.OFF:  # Check if fan is on
+        #     response2 = await self.command_response(f"{sn}F?")
+        #     line2 = response2.split("F=")[1]
+        #     if line2 == "AUTO":
+        #         return mode
+        #     elif line2 == "ON":
+        #         return HVACMode.FAN_ONLY
+        #     else:
+        #         _LOGGER.error(f"ASI: Fan check got {line2} from {response2} for mode for {sn}")
+        return self._decode(response, sn, "M", "mode")
+
+    async def _write(self, sn, field, value, expect):
+        """Write field=value, coalescing a burst of writes to the same field into the last value.
+
+        expect is the decoded value the device echoes back once the write took; a write
+        the device has already confirmed is skipped. Every caller in a burst gets the
+        reply to the one command that was sent.
+        """
+        key = (sn, field)
+        pending = self._writes.get(key)
+        if pending:
+            pending[0], pending[1] = value, expect
+            self.metrics.writes_coalesced += 1
+            return await asyncio.shield(pending[2])
+        if self.confirmed_value(sn, field) == expect:
+            self.metrics.writes_suppressed += 1
+            return self._cache[key][1]
+
+        loop = asyncio.get_running_loop()
+        pending = self._writes[key] = [value, expect, loop.create_future()]
+        # Sent from its own task so a cancelled caller does not drop the burst's last value
+        pending.append(loop.create_task(self._send_write(key, pending)))
+        return await asyncio.shield(pending[2])
+
+    async def _send_write(self, key, pending):
+        response = ""
+        try:
+            await asyncio.sleep(self.write_debounce)
+            # Writes from here on start a new burst instead of changing this one
+            del self._writes[key]
+            sn, field = key
+            value, expect = pending[0], pending[1]
+            if self.confirmed_value(sn, field) == expect:
+                # The burst ended where the device already is
+                self.metrics.writes_suppressed += 1
+                response = self._cache[key][1]
+            else:
+                response = await self._write_verified(sn, field, value, expect)
+        finally:
+            if self._writes.get(key) is pending:
+                del self._writes[key]
+            if not pending[2].done():
+                pending[2].set_result(response)
+
+    async def _write_verified(self, sn, field, value, expect, echo=None):
+        """Send a write and make sure it took.
+
+        The echo is the device's new state, so a matching echo is final: it is already
+        cached for the next poll and is passed to the listeners right away. An echo that
+        is missing or different is read back, and the write is retried if it did not take.
+        echo is the reply to a first attempt that was already sent, e.g. by write_many.
+        """
+        for attempt in range(WRITE_RETRIES + 1):
+            if echo is None:
+                response = await self.command_response(encode(sn, field, value), priority=PRIORITY_WRITE)
+            else:
+                response, echo = echo, None
+            reply = parse_line(response)
+            if not reply or reply.field != field or reply.value != expect:
+                self.metrics.write_verifies += 1
+                response = await self.command_response(encode(sn, field), priority=PRIORITY_VERIFY, force=True)
+                reply = parse_line(response)
+            if reply and reply.field == field and reply.value == expect:
+                break
+            if attempt < WRITE_RETRIES:
+                self.metrics.write_retries += 1
+                _LOGGER.warning(f"ASI: Setting {field}={value} for {sn} did not take, got {response}; retrying")
         else:
-            _LOGGER.error(f"ASI: no M= in {response} for mode for {sn}")
-        return None
-    
+            _LOGGER.error(f"ASI: Failed to set {field}={value} for {sn}, got {response}.")
+
+        # Whatever the device reports now is its state, matching or not
+        update = self.decode_update(response) if reply and reply.field == field else None
+        if update:
+            self._notify(update, response)
+        return response
+
+    async def write_many(self, writes):
+        """Send [(sn, field, value, expect)] as one pipelined burst; return {(sn, field): reported value}.
+
+        Unlike _write there is no debounce: every write is queued at once so they share
+        batches, and only those whose echo did not confirm them are read back and retried.
+        A write the device already confirmed is skipped, and one that joins a burst still
+        being debounced replaces its value.
+        """
+        async def write_one(sn, field, value, expect):
+            pending = self._writes.get((sn, field))
+            if pending:
+                pending[0], pending[1] = value, expect
+                self.metrics.writes_coalesced += 1
+                response = await asyncio.shield(pending[2])
+            elif self.confirmed_value(sn, field) == expect:
+                self.metrics.writes_suppressed += 1
+                return expect
+            else:
+                echo = await self.command_response(encode(sn, field, value), priority=PRIORITY_WRITE)
+                response = await self._write_verified(sn, field, value, expect, echo)
+            reply = parse_line(response)
+            return reply.value if reply and reply.field == field else None
+
+        # Started together, so the writes are queued before the first batch goes out
+        values = await asyncio.gather(*(write_one(*write) for write in writes))
+        return {(sn, field): value for (sn, field, _, _), value in zip(writes, values)}
+
     async def set_mode(self, sn, inmode):
         """Set the mode for a specific thermostat."""
-        mode = self.mode_convert_to.get(inmode, None)  # FAN_ONLY will set this to OFF
+        mode = MODE_ENCODE.get(inmode, None)  # FAN_ONLY will set this to OFF
         if not mode:
             _LOGGER.error(f"ASI: Wrong mode {inmode} given")
+            return
 
-        response = await self.command_response(f"{sn}M={mode}")
-        if self.mode_convert_ret[inmode] in response:
-            #_LOGGER.info(f"ASI: Mode updated successfully for {sn} to {inmode}.")
-            None
-        else:
-            _LOGGER.error(f"ASI: Failed to update mode for {sn}, Got {response}.")
+        # Failures are logged by _write, which knows the value a burst ended on
+        await self._write(sn, "M", mode, MODE_ECHO[inmode])
 
         # No longer doing the Fan from set_mode
         # # Now do the fan setup FAN_ONLY--> ON, rest --> A (Auto)
@@ -199,71 +759,70 @@ class AprilaireThermostatSerialInterface:
         # if "F=" not in response2:
         #     _LOGGER.error(f"ASI: Fan mode set {sn} for {inmode}, got back {response2}.")
 
-    async def set_fan(self, sn, onauto):
-        if onauto:
-            response = await self.command_response(f"{sn}F=ON")
-        else:
-            response = await self.command_response(f"{sn}F=A")
-        if "F=" not in response:
-            _LOGGER.error(f"ASI: Fan mode set {sn} for {onauto}, got back {response}.")
+    async def get_fan(self, sn, force=False):
+        """Get the fan setting ("ON" or "AUTO") for a specific thermostat."""
+        response = await self.command_response(encode(sn, "F"), force=force)
+        return self._decode(response, sn, "F", "fan")
 
+    async def set_fan(self, sn, onauto):
+        onauto = bool(onauto)
+        await self._write(sn, "F", FAN_ENCODE[onauto], FAN_ECHO[onauto])
 
-    async def get_setpoint(self, sn, setpoint_type):
+    async def get_setpoint(self, sn, setpoint_type, force=False):
         """Get the current temperature for a specific thermostat."""
-        if setpoint_type == HVACMode.HEAT:
-            response = await self.command_response(f"{sn}SH?")
-        elif setpoint_type == HVACMode.COOL:
-            response = await self.command_response(f"{sn}SC?")
-        else:
+        field = SETPOINT_FIELDS.get(setpoint_type)
+        if not field:
             _LOGGER.error(f"ASI: Invalid Setpoint type {setpoint_type}")
             return None
-    
-        # Parse temperature from the response (assuming format is TEMP=XX.X)
-        if "SC=" in response or "SH=" in response:
-            temp = response.split("=")[1].replace("F","")
-            #_LOGGER.info(f"ASI: Setpoint {setpoint_type} for {sn}: {temp}°F")
-            try:
-                return float(temp)
-            except:
-                _LOGGER.error(f"ASI: {temp} connot be made a temprature")
-        else:
-            _LOGGER.error(f"ASI: For setpoint temprature got  {response}")
-        _LOGGER.error(f"ASI: No setpoint temperature data received for {sn} ({setpoint_type}).")
-        return None
+        response = await self.command_response(encode(sn, field), force=force)
+        return self._decode(response, sn, field, f"setpoint ({setpoint_type})")
 
     async def set_setpoint(self, sn, setpoint_type, value):
         """Set the temperature setpoint (heat or cool) for a specific thermostat."""
-        if setpoint_type not in [HVACMode.HEAT,  HVACMode.COOL]:
+        field = SETPOINT_FIELDS.get(setpoint_type)
+        if not field:
             _LOGGER.error(f"ASI: Invalid setpoint type {setpoint_type}")
             return
-
-        if setpoint_type == HVACMode.HEAT:
-            response = await self.command_response(f"{sn}SH={int(value)}")
-        elif setpoint_type == HVACMode.COOL:
-            response = await self.command_response(f"{sn}SC={int(value)}")
-        else:
-            _LOGGER.error(f"ASI: Invalid Setpoint type {setpoint_type}")
-
-        if str(int(value)) in response:
-            #_LOGGER.info(f"ASI: Setpoint updated successfully for {sn}.")
-            None
-        else:
-            _LOGGER.error(f"ASI: Failed to update setpoint for {sn}, got {response} ({setpoint_type}={value})")
+        await self._write(sn, field, int(value), float(int(value)))
 
     def close(self):
         """Close the serial connection."""
+        if self._monitor_task:
+            self._monitor_task.cancel()
+            self._monitor_task = None
+        for pending in list(self._writes.values()):
+            pending[3].cancel()
+        self._close_streams()
+        self._set_connected(False)
+
+    def _close_streams(self):
+        """Close the current streams and fail everything waiting on them."""
+        if self._listener_task:
+            self._listener_task.cancel()
+            self._listener_task = None
+        if self._flusher:
+            self._flusher.cancel()
+            self._flusher = None
+        # Nothing will answer queued or in-flight commands any more
+        waiting = [f for q in self._queues for entries in q.values() for _, _, f, _, _ in entries]
+        waiting += [f for entries in self._pending.values() for _, f, _ in entries]
+        for future in waiting:
+            if not future.done():
+                future.set_result("")
+        for queue in self._queues:
+            queue.clear()
+        self._pending.clear()
         if self.writer:
-            self.writer.close()
+            try:
+                self.writer.close()
+            except Exception as e:
+                _LOGGER.debug(f"Error closing serial connection: {e}")
+            self.writer = None
+            self.reader = None
             _LOGGER.info("Serial connection closed.")
 
 
-
-
 if __name__ == "__main__":
-    interface = AprilaireThermostatSerialInterface()
-    thermostats = interface.query_thermostats()
-    for sn in thermostats:
-        interface.get_temperature(sn)
-        interface.set_setpoint(sn, "SETPOINTHEAT", 72)
-    interface.close()
-
+    # python -m custom_components.aprilaire_thermostat.aprilair_serial_interface ...
+    from .cli import main
+    main()
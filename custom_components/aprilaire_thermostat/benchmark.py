@@ -0,0 +1,141 @@
+"""Benchmark the serial interface against the simulated hub.
+
+Measures commands per second, p50/p99 command latency under load and the
+time of a full poll cycle (T?, H?, M?, SH?, SC? for every zone) for a range
+of zone counts, without real hardware:
+
+    python -m custom_components.aprilaire_thermostat.benchmark --zones 1 8 64
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from .aprilair_serial_interface import AprilaireThermostatSerialInterface
+from .protocol import HVACMode
+from .simulator import AprilaireSimulator
+
+DEFAULT_ZONES = (1, 2, 4, 8, 16, 32, 64)
+
+
+def percentile(samples, pct):
+    """Return the pct-th percentile of samples (nearest rank)."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def connect_interface(simulator, transport="streams", **kwargs):
+    """Return an interface connected to the simulator over the given transport."""
+    if transport == "pty":
+        interface = AprilaireThermostatSerialInterface(simulator.open_pty(), **kwargs)
+        await interface.connect()
+    elif transport == "tty":
+        interface = AprilaireThermostatSerialInterface(f"tty://{simulator.open_pty()}", **kwargs)
+        await interface.connect()
+    elif transport == "tcp":
+        port = await simulator.start_tcp()
+        interface = AprilaireThermostatSerialInterface(f"tcp://127.0.0.1:{port}", **kwargs)
+        await interface.connect()
+    else:
+        interface = AprilaireThermostatSerialInterface("simulator", **kwargs)
+        interface.attach(*await simulator.open_connection())
+    return interface
+
+
+async def poll_cycle(interface, thermostats):
+    """Read every field the coordinator needs from every thermostat, bypassing the cache."""
+    reads = []
+    for sn in thermostats:
+        reads += [
+            interface.get_temperature(sn),
+            interface.get_state(sn),
+            interface.get_mode(sn, force=True),
+            interface.get_setpoint(sn, HVACMode.HEAT, force=True),
+            interface.get_setpoint(sn, HVACMode.COOL, force=True),
+        ]
+    await asyncio.gather(*reads)
+
+
+async def measure_load(interface, thermostats, duration, concurrency):
+    """Keep concurrency commands outstanding for duration seconds; return the latencies."""
+    latencies = []
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+
+    async def worker(offset):
+        i = offset
+        while loop.time() < deadline:
+            sn = thermostats[i % len(thermostats)]
+            i += 1
+            start = time.perf_counter()
+            await interface.command_response(f"{sn}T?")
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return latencies
+
+
+async def benchmark_zones(zones, latency, jitter, duration, cycles, transport, concurrency, **kwargs):
+    """Run the benchmark for one zone count and return its results."""
+    simulator = AprilaireSimulator(zones, latency, jitter, seed=zones)
+    interface = await connect_interface(simulator, transport, **kwargs)
+    try:
+        thermostats = list(simulator.zones)
+
+        cycle_times = []
+        for _ in range(cycles):
+            start = time.perf_counter()
+            await poll_cycle(interface, thermostats)
+            cycle_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        latencies = await measure_load(interface, thermostats, duration, concurrency)
+        elapsed = time.perf_counter() - start
+    finally:
+        interface.close()
+        await simulator.close()
+
+    return {
+        "zones": zones,
+        "commands_per_s": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "poll_cycle_ms": statistics.median(cycle_times) * 1000,
+    }
+
+
+async def run_benchmark(zone_counts=DEFAULT_ZONES, latency=0.005, jitter=0.002, duration=2.0, cycles=3,
+                        transport="streams", concurrency=8, **kwargs):
+    """Benchmark every zone count in turn and return the list of results."""
+    return [
+        await benchmark_zones(zones, latency, jitter, duration, cycles, transport, concurrency, **kwargs)
+        for zones in zone_counts
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Aprilaire serial interface on a simulated bus")
+    parser.add_argument("--zones", type=int, nargs="+", default=list(DEFAULT_ZONES))
+    parser.add_argument("--latency", type=float, default=0.005, help="simulated per-command latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.002, help="extra random latency, up to (s)")
+    parser.add_argument("--duration", type=float, default=2.0, help="load test length per zone count (s)")
+    parser.add_argument("--cycles", type=int, default=3, help="poll cycles to time per zone count")
+    parser.add_argument("--concurrency", type=int, default=8, help="commands kept outstanding under load")
+    parser.add_argument("--transport", choices=["streams", "pty", "tty", "tcp"], default="streams")
+    parser.add_argument("--pipeline-depth", type=int, default=8)
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(
+        args.zones, args.latency, args.jitter, args.duration, args.cycles, args.transport,
+        args.concurrency, pipeline_depth=args.pipeline_depth,
+    ))
+    print(f"{'zones':>5} {'cmd/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'cycle ms':>9}")
+    for r in results:
+        print(f"{r['zones']:>5} {r['commands_per_s']:>8.1f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+              f"{r['poll_cycle_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,49 @@
 import logging
-import asyncio
 from homeassistant.components.binary_sensor import BinarySensorEntity
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.const import CONF_PORT
+from homeassistant.core import callback
 from .const import DOMAIN
-from .sensor import AprilaireTemperatureSensor, AprilaireModeSensor, AprilaireActionSensor
 
 _LOGGER = logging.getLogger(__name__)
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up Aprilaire binary sensors based on a config entry."""
-    thermostat_data = None
-    while not thermostat_data:
-        thermostat_data = hass.data["aprilaire_thermostat"].get("thermostats")
-        if not thermostat_data:
-            await asyncio.sleep(5)
+    # Ready as soon as discovery is; a failed discovery raises here instead of waiting forever
+    coordinator = await hass.data[DOMAIN][config_entry.entry_id]["discovery"]
+    if not coordinator:
+        return
 
-    interface, thermostats, names = thermostat_data
-
-    sensors = [
-        AprilaireTemperatureSensor(interface, sn, name)
-        for sn, name in zip(thermostats, names)
-    ] + [
-        AprilaireModeSensor(interface, sn, name)
-        for sn, name in zip(thermostats, names)
-    ] + [
-        AprilaireActionSensor(interface, sn, name)
-        for sn, name in zip(thermostats, names)
-    ]
-
-    async_add_entities(sensors, update_before_add=True)
+    async_add_entities([
+        # The port tells the buses apart when there are several hubs
+        AprilaireConnectionSensor(
+            coordinator.interface, f"Aprilaire Connection ({config_entry.data[CONF_PORT]})", config_entry.entry_id
+        )
+    ])
 
 
 class AprilaireConnectionSensor(BinarySensorEntity):
     """A binary sensor to monitor the connection status of the Aprilaire thermostat."""
 
-    def __init__(self, interface, name):
+    _attr_should_poll = False  # the interface reports every change
+
+    def __init__(self, interface, name, entry_id):
         """Initialize the binary sensor."""
         self._interface = interface
         self._attr_name = name
+        self._attr_unique_id = f"{DOMAIN}_{entry_id}_connection"  # one per bus
         self._attr_device_class = "connectivity"
-        self._is_connected = False
+        self._is_connected = interface.connected
+
+    async def async_added_to_hass(self):
+        """Follow the interface's connection state."""
+        self.async_on_remove(self._interface.add_connection_listener(self._handle_connection))
+
+    @callback
+    def _handle_connection(self, connected):
+        self._is_connected = connected
+        self.async_write_ha_state()
 
     @property
     def is_on(self):
         """Return true if the sensor is on (connected)."""
         return self._is_connected
-
-    async def async_update(self):
-        """Fetch new state data for the sensor."""
-        try:
-            self._is_connected = await self._interface.check_connection()
-        except Exception as e:
-            _LOGGER.error(f"Error updating connection status: {e}")
-            self._is_connected = False
\ No newline at end of file
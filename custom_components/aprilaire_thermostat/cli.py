@@ -0,0 +1,182 @@
+"""Command line tool to exercise a bus without Home Assistant.
+
+Runs discovery, polling, raw commands or a load test against a serial port,
+a serial server (tcp://host:port, rfc2217://host:port) or a pty, and prints
+per-command latency statistics at the end:
+
+    python -m custom_components.aprilaire_thermostat.cli --port /dev/ttyUSB0 discover
+    python -m custom_components.aprilaire_thermostat.cli --port tcp://10.0.0.5:4001 poll --interval 5
+    python -m custom_components.aprilaire_thermostat.cli --port /dev/ttyUSB0 raw SN1T? SN1M?
+    python -m custom_components.aprilaire_thermostat.cli --simulate 8 load --duration 10
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from .aprilair_serial_interface import AprilaireThermostatSerialInterface
+from .benchmark import connect_interface, measure_load, percentile
+from .protocol import HVACMode
+from .simulator import AprilaireSimulator
+
+
+async def discover(interface, args):
+    start = time.perf_counter()
+    thermostats, names = await interface.query_thermostats()
+    print(f"Found {len(thermostats)} thermostats in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for sn, name in zip(thermostats, names):
+        print(f"  {sn:<6} {name}")
+
+
+async def poll(interface, args):
+    thermostats = args.thermostats or (await interface.query_thermostats())[0]
+    count = 0
+    while True:
+        start = time.perf_counter()
+        rows = await asyncio.gather(*(poll_thermostat(interface, sn) for sn in thermostats))
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{'zone':<6} {'temp':>6} {'action':>8} {'mode':>9} {'fan':>5} {'heat':>6} {'cool':>6}   "
+              f"({elapsed:.1f} ms)")
+        for sn, (temp, action, mode, fan, heat, cool) in zip(thermostats, rows):
+            print(f"{sn:<6} {fmt(temp):>6} {fmt(action):>8} {fmt(mode):>9} {fmt(fan):>5} {fmt(heat):>6} "
+                  f"{fmt(cool):>6}")
+        count += 1
+        if not args.interval or (args.count and count >= args.count):
+            return
+        await asyncio.sleep(args.interval)
+
+
+async def poll_thermostat(interface, sn):
+    """Read every field the coordinator polls, bypassing the cache."""
+    return await asyncio.gather(
+        interface.get_temperature(sn),
+        interface.get_state(sn),
+        interface.get_mode(sn, force=True),
+        interface.get_fan(sn, force=True),
+        interface.get_setpoint(sn, HVACMode.HEAT, force=True),
+        interface.get_setpoint(sn, HVACMode.COOL, force=True),
+    )
+
+
+def fmt(value):
+    if value is None:
+        return "-"
+    return getattr(value, "value", value)
+
+
+async def raw(interface, args):
+    commands = args.commands
+    interactive = not commands
+    if interactive:
+        print("Enter commands (e.g. SN1T?), an empty line or end of input to stop")
+    loop = asyncio.get_running_loop()
+    while True:
+        if interactive:
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            commands = [line.strip()] if line.strip() else []
+            if not commands:
+                return
+        for command in commands:
+            start = time.perf_counter()
+            response = await interface.command_response(
+                command, args.timeout, multiline=args.multiline or "#" in command, force=True
+            )
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{command} -> {response.replace(chr(13), ' | ') or '(no reply)'}   [{elapsed:.1f} ms]")
+        if not interactive:
+            return
+
+
+async def load(interface, args):
+    thermostats = args.thermostats or (await interface.query_thermostats())[0]
+    if not thermostats:
+        print("No thermostats to load")
+        return
+    start = time.perf_counter()
+    latencies = await measure_load(interface, thermostats, args.duration, args.concurrency)
+    elapsed = time.perf_counter() - start
+    print(f"{len(latencies)} commands in {elapsed:.1f} s: {len(latencies) / elapsed:.1f} cmd/s, "
+          f"p50 {percentile(latencies, 50) * 1000:.2f} ms, p99 {percentile(latencies, 99) * 1000:.2f} ms")
+
+
+def print_stats(metrics):
+    """Print per-command latency statistics from the interface's bus metrics."""
+    stats = metrics.as_dict()
+    if not stats["commands"]:
+        return
+    print()
+    print(f"{'command':<8} {'count':>7} {'timeouts':>8} {'empty':>6} {'mean ms':>8} {'max ms':>8} "
+          f"{'srtt ms':>8} {'rto ms':>7}")
+    for kind, s in stats["commands"].items():
+        mean = f"{s['mean_ms']:.2f}" if s["mean_ms"] is not None else "-"
+        print(f"{kind:<8} {s['count']:>7} {s['timeouts']:>8} {s['empty_responses']:>6} {mean:>8} "
+              f"{s['max_ms']:>8.2f} {fmt(s['srtt_ms']):>8} {fmt(s['rto_ms']):>7}")
+    print(f"latency p50 {stats['latency_p50_ms']} ms, p99 {stats['latency_p99_ms']} ms, "
+          f"queue wait mean {stats['queue_wait_mean_ms']} ms, max {stats['queue_wait_max_ms']} ms, "
+          f"cache hits {stats['cache_hits']}, unsolicited {stats['unsolicited_lines']}, "
+          f"read retries {stats['read_retries']}")
+
+
+async def run(args):
+    options = {"framed": not args.legacy, "pipeline_depth": args.pipeline_depth, "push": args.push}
+    simulator = None
+    if args.simulate:
+        simulator = AprilaireSimulator(args.simulate, args.latency, args.jitter)
+        interface = await connect_interface(simulator, args.sim_transport, **options)
+    else:
+        interface = AprilaireThermostatSerialInterface(args.port, args.baudrate, **options)
+        await interface.connect()
+    try:
+        await args.func(interface, args)
+    finally:
+        interface.close()
+        if simulator:
+            await simulator.close()
+        print_stats(interface.metrics)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Talk to an Aprilaire bus without Home Assistant")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--port", help="serial device, tty:///dev/... (native), tcp://host:port or rfc2217://host:port")
+    target.add_argument("--simulate", type=int, metavar="ZONES", help="use a simulated hub with ZONES zones")
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--legacy", action="store_true", help="read replies until idle instead of framing")
+    parser.add_argument("--push", action="store_true", help="keep a listener for unsolicited status lines")
+    parser.add_argument("--pipeline-depth", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.005, help="simulated per-command latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="simulated extra random latency (s)")
+    parser.add_argument("--sim-transport", choices=["streams", "pty", "tty", "tcp"], default="pty")
+    commands = parser.add_subparsers(required=True, metavar="command")
+
+    sub = commands.add_parser("discover", help="list the thermostats on the bus")
+    sub.set_defaults(func=discover)
+
+    sub = commands.add_parser("poll", help="read every thermostat once, or repeatedly with --interval")
+    sub.add_argument("--interval", type=float, help="seconds between polls; poll until interrupted")
+    sub.add_argument("--count", type=int, help="stop after this many polls")
+    sub.add_argument("thermostats", nargs="*", help="addresses to poll (default: discover)")
+    sub.set_defaults(func=poll)
+
+    sub = commands.add_parser("raw", help="send commands as given, or read them from stdin")
+    sub.add_argument("--timeout", type=float, help="seconds to wait for a reply (default: from measured reply times)")
+    sub.add_argument("--multiline", action="store_true", help="collect replies until the bus is idle")
+    sub.add_argument("commands", nargs="*")
+    sub.set_defaults(func=raw)
+
+    sub = commands.add_parser("load", help="keep the bus busy with T? reads and report throughput")
+    sub.add_argument("--duration", type=float, default=10.0)
+    sub.add_argument("--concurrency", type=int, default=8)
+    sub.add_argument("thermostats", nargs="*", help="addresses to load (default: discover)")
+    sub.set_defaults(func=load)
+
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -7,14 +7,14 @@ from homeassistant.components.climate.const import (
     FAN_ON,
 )
 
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.util.unit_system import UnitOfTemperature
 import logging
-from .aprilair_serial_interface import AprilaireThermostatSerialInterface
-from .const import ATTR_TEMPERATURE
-from homeassistant.util import Throttle
-from datetime import timedelta
-
-MIN_TIME_BETWEEN_UPDATES = timedelta(seconds=60)
+from .const import DOMAIN, ATTR_TEMPERATURE, SIGNAL_ZONES_ADDED, SIGNAL_ZONE_WRITTEN
+from .entity import AprilaireEntity
+from .state import ThermostatState
+from .protocol import FAN_ECHO
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -24,147 +24,92 @@ SUPPORTED_HVAC_MODES = [HVACMode.OFF, HVACMode.HEAT, HVACMode.COOL]
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Setup climate entities for Aprilaire thermostats."""
-    port = config_entry.data.get("port", "/dev/ttyUSB0")
-    baudrate = config_entry.data.get("baudrate", 9600)
-    interface = AprilaireThermostatSerialInterface(port, baudrate)
-    unused = config_entry.data.get("polling_interval", 60) 
-
-    # Establish the connection
-    try:
-        await interface.connect()
-    except Exception as e:
-        _LOGGER.error(f"Failed to connect to serial device: {e}")
+    # Discovery is started by __init__ and shared by every platform
+    coordinator = await hass.data[DOMAIN][config_entry.entry_id]["discovery"]
+    if not coordinator:
         return
-    
-    # use the connection
-    (thermostats, names) = await interface.query_thermostats()
 
-    if not thermostats:
-        _LOGGER.error("No thermostats found")
-        interface.close()
-        return
-    
-    _LOGGER.error(f"Using {port}:{baudrate} setting up Thermostats:{thermostats}, with names: {names}")
+    added = set()
 
-    # Store thermostat data in hass.data
-    hass.data.setdefault("aprilaire_thermostat", {})
-    hass.data["aprilaire_thermostat"]["thermostats"] = (interface, thermostats, names)
+    @callback
+    def async_add_zones(zones):
+        # A thermostat rediscovery missed once keeps its entities, which come back with it
+        zones = [(sn, nm) for sn, nm in zones if sn not in added]
+        added.update(sn for sn, _ in zones)
+        async_add_entities([AprilaireThermostat(coordinator, sn, nm, config_entry) for sn, nm in zones])
 
+    config_entry.async_on_unload(
+        async_dispatcher_connect(hass, SIGNAL_ZONES_ADDED.format(config_entry.entry_id), async_add_zones)
+    )
 
-    entities = [AprilaireThermostat(interface, sn, nm, config_entry) for sn, nm in zip(thermostats, names)]
-    async_add_entities(entities)
+    async_add_zones(list(zip(coordinator.thermostats, coordinator.names)))
 
     _LOGGER.info("Aprilaire climate entities added successfully.")
 
-class AprilaireThermostat(ClimateEntity):
+class AprilaireThermostat(AprilaireEntity, ClimateEntity):
     """Representation of an Aprilaire thermostat."""
 
-    def __init__(self, interface, sn, nm, config):
+    _fields = ("temperature", "action")
+    _settings = ("mode", "fan", "setpoint_heat", "setpoint_cool")
+
+    _attr_temperature_unit = UnitOfTemperature.FAHRENHEIT
+    _attr_supported_features = (
+        ClimateEntityFeature.TARGET_TEMPERATURE | ClimateEntityFeature.FAN_MODE
+        | ClimateEntityFeature.TURN_OFF | ClimateEntityFeature.TURN_ON
+    )
+    _attr_hvac_modes = SUPPORTED_HVAC_MODES
+    _attr_fan_modes = [FAN_ON, FAN_AUTO]
+    _shown_attrs = (
+        "_attr_name", "_attr_current_temperature", "_attr_target_temperature", "_attr_target_temperature_high",
+        "_attr_target_temperature_low", "_attr_hvac_mode", "_attr_hvac_action", "_attr_fan_mode",
+    )
+
+    def __init__(self, coordinator, sn, nm, config):
         """Initialize the thermostat entity."""
-        self._interface = interface
-        self._sn = sn
-        self._name = f"Aprilaire Thermostat {sn} ({nm})"
-        self._current_temperature = None
-        self._setpoint_cool_temperature = None
-        self._setpoint_heat_temperature = None
-        self._hvac_mode = HVACMode.OFF
-        self._hvac_action = HVACAction.OFF
+        super().__init__(coordinator, sn)
+        # Settings only change from HA, whose writes echo into the snapshot, unless the
+        # thermostat is bidirectional; then they are polled like the readings.
+        if coordinator.bidirectional:
+            self._fields = self._fields + self._settings
+        else:
+            self._read_once_fields = self._settings
+        self._interface = coordinator.interface
+        self._attr_name = f"Aprilaire Thermostat {sn} ({nm})"
+        # Addresses repeat from hub to hub, so the id is scoped to the bus's config entry
+        self._attr_unique_id = f"{DOMAIN}_{config.entry_id}_{sn}"
+        self._entry_id = config.entry_id
+        self._nm = nm
         self._preset_mode = None
-        self._bidrectional = config.data.get("bidirectional", False) 
         self._firsttime = True
-
-    @property
-    def unique_id(self):
-        """Return the unique ID for this thermostat."""
-        return f"aprilaire_thermostat_{self._sn}_{self._name}"
-
-    @property
-    def name(self):
-        """Return the name of the thermostat."""
-        return self._name
-
-    @property
-    def temperature_unit(self):
-        """Return the unit of measurement for temperature."""
-        return UnitOfTemperature.FAHRENHEIT
-
-    @property
-    def current_temperature(self): 
-        """Return the current temperature."""
-        try:
-            return float(self._current_temperature)
-        except:
-            _LOGGER.error(f": {self._current_temperature} connot be made a temprature")
-        return None
-
-    @property
-    def target_temperature(self):
-        """Return the target temperature."""
-        if self._hvac_mode == HVACMode.COOL:
-            temp = self._setpoint_cool_temperature
-        elif self._hvac_mode == HVACMode.HEAT:
-            temp = self._setpoint_heat_temperature
+        # What HA shows: the coordinator's record, or a copy of it with the values HA just set
+        self._state = ThermostatState(sn)
+        self._seen = None  # the coordinator's record last applied
+        self._overrides = {}  # field -> (value HA set, the record's value at that time)
+        self._update_attributes()
+
+    def _update_attributes(self):
+        """Precompute what HA reads on every state write from the validated state."""
+        state = self._state
+        self._attr_current_temperature = state.temperature
+        self._attr_hvac_mode = state.mode or HVACMode.OFF
+        self._attr_hvac_action = state.action or HVACAction.OFF
+        if state.mode == HVACMode.COOL:
+            self._attr_target_temperature = state.setpoint_cool
+        elif state.mode == HVACMode.HEAT:
+            self._attr_target_temperature = state.setpoint_heat
         else:
-            return None
-        try:
-            return float(temp)
-        except:
-            _LOGGER.error(f": {temp} connot be made a temprature")
-            return None
-
-    @property
-    def target_temperature_high(self):
-        try:
-            return float(self._setpoint_heat_temperature)
-        except:
-            _LOGGER.error(f": {self._setpoint_heat_temperature} connot be made a temprature")
-            return None
-
-    @property
-    def target_temperature_low(self) -> float | None:
-        try:
-            return float(self._setpoint_cool_temperature)
-        except:
-            _LOGGER.error(f": {self._setpoint_cool_temperature} connot be made a temprature")
-            return None
-
-    @property
-    def hvac_mode(self): 
-        """Return the current HVAC mode."""
-        return self._hvac_mode
-    
-    @property
-    def hvac_action(self):
-        """Return the current running hvac operation if supported."""
-        return self._hvac_action
-
-    @property
-    def supported_features(self):
-        """Return the features supported by this thermostat."""
-        return ClimateEntityFeature.TARGET_TEMPERATURE | ClimateEntityFeature.FAN_MODE | ClimateEntityFeature.TURN_OFF | ClimateEntityFeature.TURN_ON
-
-    @property
-    def hvac_modes(self):
-        """Return the list of available HVAC modes."""
-        return SUPPORTED_HVAC_MODES
-    
-    @property
-    def fan_modes(self):
-        return [FAN_ON, FAN_AUTO]
-    
-    @property
-    def fan_mode(self):
-        if self._hvac_mode == HVACMode.FAN_ONLY:
-            return FAN_ON
-        else:
-            return FAN_AUTO
-        
+            self._attr_target_temperature = None
+        self._attr_target_temperature_high = state.setpoint_heat
+        self._attr_target_temperature_low = state.setpoint_cool
+        self._attr_fan_mode = FAN_ON if state.fan == FAN_ECHO[True] else FAN_AUTO
+
     async def async_set_fan_mode(self, fan_mode):
-        if fan_mode == FAN_ON:
-            await self._interface.set_fan(self._sn, True)
-        else:
-            await self._interface.set_fan(self._sn, False)
-        self.async_write_ha_state()
+        on = fan_mode == FAN_ON
+        self._set_local("fan", FAN_ECHO[on])
+        self._update_attributes()
+        await self._interface.set_fan(self._sn, on)
+        self.coordinator.async_note_write(self._sn)
+        self.async_write_ha_state_if_changed()
 
     async def async_set_temperature(self, **kwargs):
         """Set the target temperature for the thermostat."""
@@ -173,72 +118,92 @@ class AprilaireThermostat(ClimateEntity):
             _LOGGER.info("Setting target temperature to %s°F for %s", target_temp, self._sn)
 
             # cool setupoint cannot be lower than heat setpoint.
-            if self._hvac_mode == HVACMode.COOL:
+            if self._state.mode == HVACMode.COOL:
                 await self._interface.set_setpoint(self._sn, HVACMode.COOL, target_temp)
-                self._setpoint_cool_temperature = target_temp
-                if not self._setpoint_heat_temperature or self._setpoint_heat_temperature >= target_temp:
-                    self._setpoint_heat_temperature = target_temp - 1
-            elif self._hvac_mode == HVACMode.HEAT:
+                self._set_local("setpoint_cool", target_temp)
+                if not self._state.setpoint_heat or self._state.setpoint_heat >= target_temp:
+                    self._set_local("setpoint_heat", target_temp - 1)
+            elif self._state.mode == HVACMode.HEAT:
                 await self._interface.set_setpoint(self._sn, HVACMode.HEAT, target_temp)
-                self._setpoint_heat_temperature = target_temp
-                if not self._setpoint_cool_temperature or self._setpoint_cool_temperature <= target_temp:
-                    self._setpoint_cool_temperature = target_temp + 1
+                self._set_local("setpoint_heat", target_temp)
+                if not self._state.setpoint_cool or self._state.setpoint_cool <= target_temp:
+                    self._set_local("setpoint_cool", target_temp + 1)
             else:
-                _LOGGER.error(f"Cannot set setpoint when mode is {self._hvac_mode} or not {self._setpoint_heat_temperature} < {target_temp} < {self._setpoint_cool_temperature}")
-            self.async_write_ha_state()
+                _LOGGER.error(f"Cannot set setpoint when mode is {self._state.mode} or not {self._state.setpoint_heat} < {target_temp} < {self._state.setpoint_cool}")
+            self._update_attributes()
+            self.coordinator.async_note_write(self._sn)
+            self.async_write_ha_state_if_changed()
 
     async def async_set_hvac_mode(self, mode):
         """Set the HVAC mode for the thermostat."""
         if mode not in SUPPORTED_HVAC_MODES:
             _LOGGER.error("Unsupported HVAC mode: %s", mode)
             return
-        self._hvac_mode = mode
+        self._set_local("mode", mode)
+        self._update_attributes()
         await self._interface.set_mode(self._sn, mode)
-        self.async_write_ha_state()
+        self.coordinator.async_note_write(self._sn)
+        self.async_write_ha_state_if_changed()
 
     
     async def get_action(self):
         st = await self._interface.get_state(self._sn)
         if st:
-            if st == HVACAction.OFF and self._hvac_mode != HVACMode.OFF:
+            if st == HVACAction.OFF and self._attr_hvac_mode != HVACMode.OFF:
                 st = HVACAction.IDLE
             return st
         return None
 
-    @Throttle(MIN_TIME_BETWEEN_UPDATES)
-    async def async_update(self):
-        """Fetch new data from the Aprilaire thermostat."""
-        #_LOGGER.debug(f"Updating Aprilaire thermostat {self._sn} ")
-
-        # Get current temperature
-        tt = await self._interface.get_temperature(self._sn)
-        if tt:
-            self._current_temperature = tt 
-
-        #Get the current state
-        st = await self._interface.get_state(self._sn)
-        if st:
-            self._hvac_action = st
+    async def async_added_to_hass(self):
+        """Listen for bulk_set writes besides the coordinator."""
+        await super().async_added_to_hass()
+        self.async_on_remove(async_dispatcher_connect(
+            self.hass, SIGNAL_ZONE_WRITTEN.format(self._entry_id, self._sn), self._handle_written
+        ))
+
+    @callback
+    def _handle_written(self, values):
+        """Show what the bulk_set service wrote to this thermostat."""
+        for field, value in values.items():
+            self._set_local(field, value)
+        self._update_attributes()
+        self.async_write_ha_state_if_changed()
+
+    def _set_local(self, field, value):
+        """Show a value HA just wrote until the bus reports a different one than it did then.
+
+        The write's echo ends the override, while a poll answered before the write
+        went out does not undo it.
+        """
+        if self._state is self._seen:
+            self._state = self._state.copy()  # the coordinator's record is shared
+        self._overrides[field] = (value, getattr(self._seen, field, None))
+        setattr(self._state, field, value)
+
+    def _update_from_snapshot(self):
+        """Show this thermostat's new record, keeping the values HA set that the bus has not answered.
+
+        Settings come from the record too, whether polled, pushed by the hub or echoed
+        by a write, so changes made at the wall show up.
+        """
+        data = self._snapshot
+        if data is None or data is self._seen:
+            return
 
         #Name will not change, so get it once.
         if self._firsttime:
-            self._name = await self._interface.get_name(self._sn)
-
-        if self._bidrectional or self._firsttime:
-            # Need to get what is on the thermostats after initialization
-            self._firsttime = False 
-
-            # Get target temperature (e.g., setpoint)
-            # Here, you could implement separate commands for reading setpoints if needed
-            sht = await self._interface.get_setpoint(self._sn, HVACMode.HEAT)
-            sct = await self._interface.get_setpoint(self._sn, HVACMode.COOL)
-            if sht:
-                self._setpoint_heat_temperature = sht
-            if sct:
-                self._setpoint_cool_temperature = sct
-
-            # Get HVAC mode if available
-            md = await self._interface.get_mode(self._sn)
-            if md:
-                self._hvac_mode = md
-
+            self._attr_name = self._nm
+            self._firsttime = False
+
+        self._seen = data
+        for field, (value, seen) in list(self._overrides.items()):
+            if getattr(data, field) != seen:
+                del self._overrides[field]
+        if self._overrides:
+            state = data.copy()
+            for field, (value, _) in self._overrides.items():
+                setattr(state, field, value)
+            self._state = state
+        else:
+            self._state = data
+        self._update_attributes()
@@ -2,12 +2,23 @@ import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback
 
-from .const import DOMAIN, CONF_BAUDRATE
+from .const import (
+    DOMAIN, CONF_BAUDRATE, CONF_BIDIRECTIONAL, CONF_PUSH, CONF_POLLING_INTERVAL, CONF_TRANSPORT,
+    DEFAULT_POLLING_INTERVAL,
+)
+from .transport import TRANSPORTS, TRANSPORT_SERIAL, TRANSPORT_TCP, split_host_port, transport_url
+
+def _valid_host_port(port):
+    try:
+        split_host_port(transport_url(TRANSPORT_TCP, port))
+    except ValueError:
+        return False
+    return True
 
 class AprilaireThermostatConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Aprilaire thermostat integration."""
 
-    VERSION = 1
+    VERSION = 2  # 2: the bidirectional flag is stored as CONF_BIDIRECTIONAL
 
     async def async_step_user(self, user_input=None):
         """Handle the initial step."""
@@ -20,10 +31,15 @@ class AprilaireThermostatConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
             if not port or not baudrate:
                 errors["base"] = "missing_data"
+            elif user_input.get(CONF_TRANSPORT) == TRANSPORT_TCP and not _valid_host_port(port):
+                errors["base"] = "invalid_host"
             else:
+                # One entry per bus; several hubs need several ports
+                await self.async_set_unique_id(port)
+                self._abort_if_unique_id_configured()
                 # Save configuration and proceed
                 return self.async_create_entry(
-                    title="Aprilaire Thermostat",
+                    title=f"Aprilaire Thermostat ({port})",
                     data=user_input
                 )
 
@@ -32,10 +48,14 @@ class AprilaireThermostatConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             step_id="user",
             data_schema=vol.Schema(
                 {
+                    # For tcp and rfc2217 the port is host:port of the serial server, e.g. ser2net;
+                    # tty opens a local device natively with low latency settings
+                    vol.Required(CONF_TRANSPORT, default=TRANSPORT_SERIAL): vol.In(TRANSPORTS),
                     vol.Required("port", default="/dev/ttyUSB0"): str,
                     vol.Required("baudrate", default=9600): int,
-                    vol.Required("polling_interval", default=60): int, 
-                    vol.Required("bidrectional", default=False): bool, 
+                    vol.Required(CONF_POLLING_INTERVAL, default=DEFAULT_POLLING_INTERVAL): int,
+                    vol.Required(CONF_BIDIRECTIONAL, default=False): bool,
+                    vol.Required(CONF_PUSH, default=False): bool,
                 }
             ),
             errors=errors,
@@ -52,7 +72,7 @@ class AprilaireThermostatOptionsFlowHandler(config_entries.OptionsFlow):
 
     def __init__(self, config_entry):
         """Initialize Aprilaire options flow."""
-        print(config_entry)
+        self._entry = config_entry
 
 
     async def async_step_init(self, user_input=None):
@@ -66,7 +86,12 @@ class AprilaireThermostatOptionsFlowHandler(config_entries.OptionsFlow):
             step_id="init",
             data_schema=vol.Schema(
                 {
-                    vol.Required("polling_interval", default=60): int,
+                    vol.Required(
+                        CONF_POLLING_INTERVAL,
+                        default=self._entry.options.get(
+                            CONF_POLLING_INTERVAL, self._entry.data.get(CONF_POLLING_INTERVAL, DEFAULT_POLLING_INTERVAL)
+                        ),
+                    ): vol.All(int, vol.Range(min=5)),
                 }
             ),
         )
@@ -2,4 +2,26 @@ DOMAIN = "aprilaire_thermostat"
 
 # Custom configuration keys
 CONF_BAUDRATE = "baudrate"
+CONF_PUSH = "push"
+CONF_POLLING_INTERVAL = "polling_interval"
+CONF_TRANSPORT = "transport"
+CONF_BIDIRECTIONAL = "bidirectional"
+# Entries created before version 2 stored the bidirectional flag under this misspelt key
+CONF_BIDIRECTIONAL_V1 = "bidrectional"
+
+DEFAULT_POLLING_INTERVAL = 60
+
 ATTR_TEMPERATURE = "temperature"
+
+# Discovered zones are persisted so later startups can skip discovery
+STORAGE_VERSION = 1
+
+# Sent with [(sn, name), ...] when rediscovery finds new thermostats
+SIGNAL_ZONES_ADDED = f"{DOMAIN}_zones_added_{{}}"
+
+# Sent with {snapshot field: value} once bulk_set has changed a thermostat
+SIGNAL_ZONE_WRITTEN = f"{DOMAIN}_zone_written_{{}}_{{}}"
+
+SERVICE_BULK_SET = "bulk_set"
+ATTR_HEAT_SETPOINT = "heat_setpoint"
+ATTR_COOL_SETPOINT = "cool_setpoint"
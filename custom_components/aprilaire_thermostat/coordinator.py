@@ -0,0 +1,331 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.components.climate.const import HVACMode, HVACAction
+
+from .const import (
+    DOMAIN, STORAGE_VERSION, SIGNAL_ZONES_ADDED, CONF_BAUDRATE, CONF_BIDIRECTIONAL, CONF_POLLING_INTERVAL,
+    DEFAULT_POLLING_INTERVAL,
+)
+from .state import FIELDS, ThermostatState
+
+_LOGGER = logging.getLogger(__name__)
+
+# A thermostat that was just written to, or is heating or cooling, is polled
+# this often (seconds); an idle one backs off towards the configured interval.
+FAST_POLL_INTERVAL = 10
+FAST_POLL_WINDOW = 120  # seconds of fast polling after a write
+ACTIVE_ACTIONS = (HVACAction.HEATING, HVACAction.COOLING)
+
+# Snapshot fields and how to read them
+READERS = {
+    "temperature": lambda interface, sn: interface.get_temperature(sn),
+    "action": lambda interface, sn: interface.get_state(sn),
+    "mode": lambda interface, sn: interface.get_mode(sn),
+    "fan": lambda interface, sn: interface.get_fan(sn),
+    "setpoint_heat": lambda interface, sn: interface.get_setpoint(sn, HVACMode.HEAT),
+    "setpoint_cool": lambda interface, sn: interface.get_setpoint(sn, HVACMode.COOL),
+}
+
+SNAPSHOT_SAVE_DELAY = 900  # seconds, as RestoreEntity; the snapshot is also written on shutdown and unload
+
+
+def discovery_store(hass, entry_id):
+    """Return the store holding the thermostats last discovered for a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+
+
+async def async_setup_coordinator(hass, config_entry, interface):
+    """Find the thermostats on a bus and start its coordinator; returns None if there are none."""
+    port = config_entry.data.get("port", "/dev/ttyUSB0")
+    baudrate = config_entry.data.get(CONF_BAUDRATE, 9600)
+    # The options flow can override the interval chosen when the entry was created
+    polling_interval = config_entry.options.get(
+        CONF_POLLING_INTERVAL, config_entry.data.get(CONF_POLLING_INTERVAL, DEFAULT_POLLING_INTERVAL)
+    )
+
+    # Start from the thermostats found last time and rediscover in the background
+    store = discovery_store(hass, config_entry.entry_id)
+    saved = await store.async_load()
+    if saved and saved.get("thermostats"):
+        (thermostats, names) = (saved["thermostats"], saved["names"])
+    else:
+        saved = None
+        (thermostats, names) = await interface.query_thermostats()
+
+    if not thermostats:
+        _LOGGER.error("No thermostats found")
+        return None
+
+    _LOGGER.info(f"Using {port}:{baudrate} setting up Thermostats:{thermostats}, with names: {names}")
+
+    # One coordinator polls the whole bus; every entity reads its snapshot
+    coordinator = AprilaireCoordinator(
+        hass, interface, thermostats, names, config_entry.data.get(CONF_BIDIRECTIONAL, False),
+        store, config_entry.entry_id, polling_interval
+    )
+    if saved:
+        # Entities come up with the last known values at once; the bus confirms them in the background
+        coordinator.async_restore(saved.get("snapshot"))
+        config_entry.async_create_background_task(
+            hass, _async_refresh_and_rediscover(coordinator), "aprilaire_thermostat rediscovery"
+        )
+    else:
+        await coordinator.async_save_discovery()
+        await coordinator.async_refresh()
+    # Status lines the hub sends on its own go straight into the snapshot
+    config_entry.async_on_unload(interface.add_listener(coordinator.async_handle_push))
+    config_entry.async_on_unload(interface.add_connection_listener(coordinator.async_handle_connection))
+    return coordinator
+
+
+async def _async_refresh_and_rediscover(coordinator):
+    """Bring the saved thermostats up to date, then look for added or removed ones."""
+    await coordinator.async_refresh()
+    await coordinator.async_rediscover()
+
+
+class AprilaireCoordinator(DataUpdateCoordinator):
+    """Poll the thermostats on one bus, each on its own schedule, and share the snapshot."""
+
+    def __init__(self, hass, interface, thermostats, names, bidirectional=False, store=None, entry_id=None,
+                 polling_interval=DEFAULT_POLLING_INTERVAL):
+        """Initialize the coordinator for one serial bus."""
+        self.polling_interval = max(1, polling_interval)
+        self.fast_interval = min(FAST_POLL_INTERVAL, self.polling_interval)
+        # The coordinator ticks at the fast rate; each tick polls only the thermostats that are due.
+        # always_update=False so a tick that changed nothing does not rewrite every entity.
+        super().__init__(
+            hass, _LOGGER, name=f"{DOMAIN} {interface.port}", update_interval=timedelta(seconds=self.fast_interval),
+            always_update=False,
+        )
+        self.interface = interface
+        self.thermostats = list(thermostats)
+        self.names = list(names)
+        # Saved thermostats skip discovery, so the interface learns them here for its heartbeat
+        interface.thermostats = list(thermostats)
+        self._store = store
+        self._save_pending = False  # a delayed snapshot save is scheduled
+        self._last_save = hass.loop.time()  # the store was just loaded or written
+        self._entry_id = entry_id
+        # Settings change at the wall too, so they are polled rather than read once
+        self.bidirectional = bidirectional
+        self._next_poll = {}  # sn -> loop time the thermostat is next due
+        self._interval = {}  # sn -> its current polling interval
+        self._fast_until = {}  # sn -> loop time its post-write fast window ends
+        self._subscriptions = {}  # sn -> {field: number of entities using it}
+        self._read_once = {}  # sn -> {field: number of entities that only need it known}
+
+    async def _async_update_data(self):
+        """Poll the thermostats that are due and merge them into the snapshot."""
+        if not self.interface.connected:
+            raise UpdateFailed("Serial connection lost, reconnecting")
+        previous = self.data or {}
+        now = self.hass.loop.time()
+        due = [sn for sn in self.thermostats if sn not in previous or now >= self._next_poll.get(sn, 0)]
+        # Restored thermostats that were heating or cooling are the most likely to have changed
+        due.sort(key=lambda sn: (not (sn in previous and previous[sn].stale),
+                                 sn not in previous or previous[sn].action not in ACTIVE_ACTIONS))
+        try:
+            # Issued concurrently so the interface can pipeline them onto the bus
+            snapshots = await asyncio.gather(*(
+                self._async_poll_thermostat(sn, previous.get(sn)) for sn in due
+            ))
+        except Exception as e:
+            raise UpdateFailed(f"Error polling thermostats: {e}") from e
+
+        polled = dict(zip(due, snapshots))
+        now = self.hass.loop.time()
+        for sn in due:
+            self._schedule(sn, polled[sn], now, len(due))
+        for sn in list(self._next_poll):
+            if sn not in self.thermostats:
+                self._forget(sn)
+        data = {sn: polled[sn] if sn in polled else previous[sn] for sn in self.thermostats}
+        if data != previous:
+            self._async_schedule_save()
+        return data
+
+    def _schedule(self, sn, snapshot, now, polled):
+        """Pick when a thermostat is polled next from what it is doing."""
+        if now < self._fast_until.get(sn, 0) or snapshot.action in ACTIVE_ACTIONS:
+            interval = self.fast_interval
+        else:
+            # Double towards the configured interval while it stays idle
+            interval = min(self.polling_interval, self._interval.get(sn, self.fast_interval) * 2)
+        first = sn not in self._interval
+        self._interval[sn] = interval
+        if first and polled > 1:
+            # Spread thermostats polled together at startup over one interval so later ticks share the load
+            interval *= (self.thermostats.index(sn) + 1) / len(self.thermostats)
+        self._next_poll[sn] = now + interval
+
+    def _forget(self, sn):
+        self._next_poll.pop(sn, None)
+        self._interval.pop(sn, None)
+        self._fast_until.pop(sn, None)
+
+    @callback
+    def async_note_write(self, sn):
+        """Poll a thermostat fast for a while after HA changed it, to follow the change through."""
+        now = self.hass.loop.time()
+        self._fast_until[sn] = now + FAST_POLL_WINDOW
+        self._interval[sn] = self.fast_interval
+        self._next_poll[sn] = min(self._next_poll.get(sn, now), now + self.fast_interval)
+
+    @callback
+    def async_subscribe(self, sn, fields, read_once=()):
+        """Register an entity's interest in fields of a thermostat; returns an unsubscribe callback.
+
+        Only subscribed fields are polled, so disabled entities cost no bus time. Fields in
+        read_once are only read while unknown or stale, e.g. settings that change only from
+        HA, whose writes echo into the snapshot.
+        """
+        polled = self._subscriptions.setdefault(sn, {})
+        once = self._read_once.setdefault(sn, {})
+        snapshot = (self.data or {}).get(sn)
+        if any(not polled.get(field) and (snapshot is None or getattr(snapshot, field) is None)
+               for field in (*fields, *read_once)):
+            self._next_poll[sn] = 0  # read the newly wanted fields on the next tick
+        subscribed = [(polled, field) for field in fields] + [(once, field) for field in read_once]
+        for counts, field in subscribed:
+            counts[field] = counts.get(field, 0) + 1
+
+        @callback
+        def unsubscribe():
+            for counts, field in subscribed:
+                counts[field] -= 1
+                if not counts[field]:
+                    del counts[field]
+
+        return unsubscribe
+
+    def polled_fields(self, sn, snapshot=None):
+        """Return the snapshot fields that the next poll of a thermostat reads."""
+        if not any(self._subscriptions.values()):
+            # Nothing has subscribed yet (startup), so take a full snapshot
+            return list(READERS)
+        snapshot = snapshot or (self.data or {}).get(sn)
+        polled = self._subscriptions.get(sn, {})
+        once = self._read_once.get(sn, {})
+        unknown = snapshot is None or snapshot.stale
+        return [
+            field for field in READERS
+            if polled.get(field) or (once.get(field) and (unknown or getattr(snapshot, field) is None))
+        ]
+
+    async def _async_poll_thermostat(self, sn, previous):
+        """Read the subscribed fields of one thermostat into a new, validated record.
+
+        A failed read keeps the last value. The previous record is returned as is when
+        nothing changed, so entities can skip an unchanged thermostat.
+        """
+        previous = previous or ThermostatState(sn)
+        reads = {field: READERS[field](self.interface, sn) for field in self.polled_fields(sn, previous)}
+        if not reads:
+            return previous
+        values = await asyncio.gather(*reads.values())
+
+        snapshot = previous.copy()
+        changed = False
+        for field, value in zip(reads, values):
+            if value:
+                changed |= snapshot.apply(field, value)
+                if snapshot.stale:
+                    snapshot.stale = False
+                    changed = True
+        return snapshot if changed else previous
+
+    @callback
+    def async_restore(self, saved):
+        """Start from the snapshot saved at the last shutdown, marked stale until polled again."""
+        data = {}
+        for sn in self.thermostats:
+            snapshot = ThermostatState(sn)
+            snapshot.stale = True
+            for field, value in (saved or {}).get(sn, {}).items():
+                if field in FIELDS:
+                    snapshot.apply(field, value)
+            data[sn] = snapshot
+        self.data = data
+
+    def _stored_data(self):
+        snapshot = {sn: state.as_dict() for sn, state in (self.data or {}).items()}
+        return {"thermostats": self.thermostats, "names": self.names, "snapshot": snapshot}
+
+    def _stored_data_for_save(self):
+        # Called by the store when the delayed save is written
+        self._save_pending = False
+        self._last_save = self.hass.loop.time()
+        return self._stored_data()
+
+    @callback
+    def _async_schedule_save(self):
+        """Save the changed snapshot SNAPSHOT_SAVE_DELAY after the last save, at the latest.
+
+        A save that is already scheduled is left alone: rescheduling on every change
+        would push it back forever on a busy bus.
+        """
+        if not self._store or self._save_pending:
+            return
+        self._save_pending = True
+        delay = max(0, self._last_save + SNAPSHOT_SAVE_DELAY - self.hass.loop.time())
+        self._store.async_delay_save(self._stored_data_for_save, delay)
+
+    async def async_save_discovery(self):
+        """Persist the current thermostats and snapshot, e.g. so the next startup can skip discovery."""
+        if self._store:
+            # Replaces any scheduled save
+            self._save_pending = False
+            self._last_save = self.hass.loop.time()
+            await self._store.async_save(self._stored_data())
+
+    async def async_rediscover(self):
+        """Query the bus again and apply only the thermostats that were added or removed."""
+        thermostats, names = await self.interface.query_thermostats()
+        if not thermostats:
+            _LOGGER.warning("Rediscovery found no thermostats, keeping the saved ones")
+            return
+
+        added = [(sn, nm) for sn, nm in zip(thermostats, names) if sn not in self.thermostats]
+        removed = [sn for sn in self.thermostats if sn not in thermostats]
+        if thermostats == self.thermostats and names == self.names:
+            return
+
+        _LOGGER.info(f"Rediscovery: added {added}, removed {removed}")
+        self.thermostats, self.names = thermostats, names
+        self.interface.thermostats = list(thermostats)
+        await self.async_save_discovery()
+        if added:
+            async_dispatcher_send(self.hass, SIGNAL_ZONES_ADDED.format(self._entry_id), added)
+        # Entities of missing thermostats show as unavailable after the next update
+        await self.async_refresh()
+
+    @callback
+    def async_handle_connection(self, connected):
+        """Mark entities unavailable while the bus is down and refresh once it is back."""
+        if connected:
+            self.hass.async_create_task(self.async_request_refresh())
+        else:
+            self.async_set_update_error(UpdateFailed("Serial connection lost, reconnecting"))
+
+    @callback
+    def async_handle_push(self, sn, field, value):
+        """Merge an unsolicited status line or a write echo into the snapshot and notify entities."""
+        if not self.data or sn not in self.data:
+            return
+        snapshot = self.data[sn].copy()
+        if not snapshot.apply(field, value):
+            return
+        self.data[sn] = snapshot
+        if field == "action" and value in ACTIVE_ACTIONS:
+            # Follow a cycle the wall thermostat just started at the fast rate
+            self._next_poll[sn] = min(self._next_poll.get(sn, 0), self.hass.loop.time() + self.fast_interval)
+        self._async_schedule_save()
+        # Deliberately not async_set_updated_data: that would push back the next poll
+        self.async_update_listeners()
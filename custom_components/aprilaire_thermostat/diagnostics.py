@@ -0,0 +1,25 @@
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry):
+    """Return bus statistics and the latest snapshot for a config entry."""
+    data = hass.data.get(DOMAIN, {}).get(entry.entry_id, {})
+    interface = data.get("interface")
+    discovery = data.get("discovery")
+    coordinator = None
+    if discovery and discovery.done() and not discovery.cancelled() and not discovery.exception():
+        coordinator = discovery.result()
+
+    return {
+        "entry": dict(entry.data),
+        "thermostats": dict(zip(coordinator.thermostats, coordinator.names)) if coordinator else {},
+        "snapshot": {
+            sn: {**state.as_dict(), "stale": state.stale} for sn, state in (coordinator.data or {}).items()
+        } if coordinator else None,
+        "last_update_success": coordinator.last_update_success if coordinator else None,
+        "polled_fields": {sn: coordinator.polled_fields(sn) for sn in coordinator.thermostats} if coordinator else None,
+        "metrics": interface.metrics.as_dict() if interface else None,
+    }
@@ -0,0 +1,78 @@
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+class AprilaireEntity(CoordinatorEntity):
+    """Base for entities that show one thermostat's part of the coordinator snapshot."""
+
+    # Snapshot fields the entity shows; only fields some enabled entity uses are polled
+    _fields = ()
+    # Fields the entity shows that are only read while unknown or stale
+    _read_once_fields = ()
+    # Attributes HA shows for the entity; state is only written when one of them changed
+    _shown_attrs = ()
+
+    def __init__(self, coordinator, sn):
+        """Initialize the entity for thermostat sn."""
+        super().__init__(coordinator)
+        self._sn = sn
+        self._state = None  # the coordinator's record the attributes were computed from
+        self._shown = None  # what the last state write showed
+
+    async def async_added_to_hass(self):
+        """Subscribe to this entity's fields; disabled entities are never added, so never polled."""
+        await super().async_added_to_hass()
+        self.async_on_remove(self.coordinator.async_subscribe(self._sn, self._fields, self._read_once_fields))
+        # Pick up the snapshot taken before the entity was added; HA writes it once we return
+        self._update_from_snapshot()
+        self._shown = self._shown_state()
+
+    def _update_from_snapshot(self):
+        """Precompute the attributes from the thermostat's record, if the coordinator replaced it."""
+        state = self._snapshot
+        if state is not None and state is not self._state:
+            self._state = state
+            self._update_attributes()
+
+    def _update_attributes(self):
+        """Set the _attr_* values HA reads on every state write from self._state."""
+
+    def _shown_state(self):
+        return (self.available, self.extra_state_attributes, tuple(getattr(self, a) for a in self._shown_attrs))
+
+    @callback
+    def async_write_ha_state_if_changed(self):
+        """Write state only if something HA shows changed since the last write.
+
+        An unchanged write still costs building the state, comparing it in the state
+        machine and, with force_update, an event and recorder row, so most polls skip it.
+        """
+        metrics = self.coordinator.interface.metrics
+        shown = self._shown_state()
+        if shown == self._shown:
+            metrics.state_writes_suppressed += 1
+            return
+        self._shown = shown
+        metrics.state_writes += 1
+        self.async_write_ha_state()
+
+    @property
+    def _snapshot(self):
+        """Return the coordinator's validated record for this thermostat, if it has one."""
+        return (self.coordinator.data or {}).get(self._sn)
+
+    @property
+    def extra_state_attributes(self):
+        """Flag values restored from the last run that the bus has not confirmed yet."""
+        snapshot = self._snapshot
+        return {"stale": bool(snapshot and snapshot.stale)}
+
+    @property
+    def available(self):
+        """Unavailable while the bus is down, or while rediscovery does not find the thermostat."""
+        return super().available and self._sn in self.coordinator.thermostats
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Write state if it changed."""
+        self._update_from_snapshot()
+        self.async_write_ha_state_if_changed()
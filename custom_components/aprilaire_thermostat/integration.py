@@ -0,0 +1,115 @@
+"""Set up the Aprilaire thermostat integration in Home Assistant."""
+import logging
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_PORT
+from homeassistant.core import callback
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers import entity_registry as er
+from .const import DOMAIN, CONF_BAUDRATE, CONF_BIDIRECTIONAL, CONF_BIDIRECTIONAL_V1, CONF_PUSH, CONF_TRANSPORT
+from .aprilair_serial_interface import AprilaireThermostatSerialInterface
+from .coordinator import async_setup_coordinator, discovery_store
+from .services import async_setup_services
+from .transport import TRANSPORT_SERIAL, transport_url
+
+_LOGGER = logging.getLogger(__name__)
+
+# Pre-import platform modules to avoid blocking during async setup
+PLATFORMS = ["climate", "binary_sensor", "sensor"]
+
+async def async_setup(hass: HomeAssistant, config: dict):
+    """Set up Aprilaire thermostat integration from YAML."""
+    _LOGGER.info("Setting up Aprilaire thermostat from YAML (if applicable)")
+    async_setup_services(hass)
+    return True
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Set up Aprilaire thermostat integration from a config entry."""
+    _LOGGER.info("Setting up Aprilaire thermostat from config entry")
+
+    # A serial device path, or host:port of a serial server for the network transports
+    port = transport_url(entry.data.get(CONF_TRANSPORT, TRANSPORT_SERIAL), entry.data[CONF_PORT])
+    baudrate = entry.data.get(CONF_BAUDRATE, 9600)
+
+    try:
+        # Initialize and connect the interface asynchronously
+        interface = AprilaireThermostatSerialInterface(port, baudrate, push=entry.data.get(CONF_PUSH, False))
+        await interface.connect()  # Asynchronous connection
+        interface.start_monitor()  # heartbeat an idle bus and reconnect if the adapter drops
+
+        # Each config entry is one bus with its own interface, queue and coordinator
+        hass.data.setdefault(DOMAIN, {})
+        hass.data[DOMAIN][entry.entry_id] = {"interface": interface}
+
+        _LOGGER.info("Serial connection established successfully")
+
+    except Exception as e:
+        _LOGGER.error(f"Failed to set up serial connection: {e}")
+        raise ConfigEntryNotReady from e
+
+    await er.async_migrate_entries(hass, entry.entry_id, _migrate_unique_id(entry))
+
+    # Discovery runs once, alongside the platform setups; each platform awaits this task for
+    # the coordinator (None when no thermostat answered) or the error that stopped discovery
+    hass.data[DOMAIN][entry.entry_id]["discovery"] = entry.async_create_task(
+        hass, async_setup_coordinator(hass, entry, interface), "aprilaire_thermostat discovery"
+    )
+
+    # Use the updated method to forward platform setups
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    # A new polling interval from the options flow takes effect on reload
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
+    return True
+
+def _migrate_unique_id(entry):
+    """Move climate entities from the old name based ids to ids scoped to the config entry."""
+    @callback
+    def migrate(entity_entry):
+        # Old ids look like "aprilaire_thermostat_SN1_Aprilaire Thermostat SN1 (Zone1)"
+        parts = entity_entry.unique_id.split("_", 3)
+        if entity_entry.domain != "climate" or len(parts) < 4 or not parts[3].startswith("Aprilaire"):
+            return None
+        return {"new_unique_id": f"{DOMAIN}_{entry.entry_id}_{parts[2]}"}
+    return migrate
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Reload the integration after its options changed."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Move the bidirectional flag of version 1 entries to its correctly spelt key."""
+    if entry.version == 1:
+        data = dict(entry.data)
+        data[CONF_BIDIRECTIONAL] = data.pop(CONF_BIDIRECTIONAL_V1, False)
+        hass.config_entries.async_update_entry(entry, data=data, version=2)
+        _LOGGER.info(f"Migrated config entry {entry.title} to version 2")
+    return True
+
+async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Unload the integration."""
+    _LOGGER.info("Unloading Aprilaire thermostat integration")
+
+    # Write the latest snapshot now; a reload would otherwise drop a scheduled save
+    discovery = hass.data[DOMAIN][entry.entry_id].get("discovery")
+    if discovery and discovery.done() and not discovery.cancelled() and not discovery.exception():
+        coordinator = discovery.result()
+        if coordinator:
+            await coordinator.async_save_discovery()
+
+    interface = hass.data[DOMAIN][entry.entry_id].get("interface")
+    if interface:
+        interface.close()  # Close the serial connection gracefully
+
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+
+    if unload_ok:
+        hass.data[DOMAIN].pop(entry.entry_id)
+        if not hass.data[DOMAIN]:
+            hass.data.pop(DOMAIN)
+
+    return unload_ok
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Forget the saved thermostats when the integration is removed."""
+    await discovery_store(hass, entry.entry_id).async_remove()
@@ -0,0 +1,198 @@
+import re
+import time
+from bisect import bisect_left
+from collections import deque
+
+# Upper edges of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, float("inf"))
+
+RECENT_SAMPLES = 256
+
+# Reply time smoothing, as TCP does it (RFC 6298)
+RTT_ALPHA = 1 / 8  # gain of the smoothed reply time
+RTT_BETA = 1 / 4  # gain of its mean deviation
+RTT_K = 4  # deviations of headroom in a timeout
+RTT_GRANULARITY = 0.005  # seconds; least headroom, about the event loop's timer resolution
+
+COMMAND_TYPE_RE = re.compile(r"\s*SN\d+\s*([A-Z]+\s*[?=]?)")
+
+
+def command_type(command):
+    """Return the metrics key for a command, e.g. "SN1SH=70" -> "SH=", "SN?#" -> "SN?#"."""
+    match = COMMAND_TYPE_RE.match(command)
+    return match.group(1).replace(" ", "") if match else command.strip()
+
+
+class RttEstimator:
+    """Smoothed reply time and its mean deviation, in seconds."""
+
+    def __init__(self):
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+
+    def sample(self, rtt):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar += RTT_BETA * (abs(self.srtt - rtt) - self.rttvar)
+            self.srtt += RTT_ALPHA * (rtt - self.srtt)
+        self.samples += 1
+
+    def timeout(self):
+        """Return how long a reply can reasonably take, or None before the first sample."""
+        if self.srtt is None:
+            return None
+        return self.srtt + max(RTT_GRANULARITY, RTT_K * self.rttvar)
+
+    def as_dict(self):
+        def ms(value):
+            return round(value * 1000, 2) if value is not None else None
+
+        return {"srtt_ms": ms(self.srtt), "rttvar_ms": ms(self.rttvar), "rto_ms": ms(self.timeout())}
+
+
+class CommandStats:
+    """Counters and a latency histogram for one command type."""
+
+    def __init__(self):
+        self.count = 0
+        self.timeouts = 0
+        self.empty = 0
+        self.parse_failures = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.histogram = [0] * len(LATENCY_BUCKETS_MS)
+        self.rtt = RttEstimator()
+
+    def as_dict(self):
+        return {
+            **self.rtt.as_dict(),
+            "count": self.count,
+            "timeouts": self.timeouts,
+            "empty_responses": self.empty,
+            "parse_failures": self.parse_failures,
+            "mean_ms": round(self.total_s / self.count * 1000, 2) if self.count else None,
+            "max_ms": round(self.max_s * 1000, 2),
+            "histogram_ms": {
+                str(edge): n for edge, n in zip(LATENCY_BUCKETS_MS, self.histogram)
+            },
+        }
+
+
+class BusMetrics:
+    """Per-command-type statistics for one serial bus."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.commands = {}
+        self.queue_wait_total_s = 0.0
+        self.queue_wait_max_s = 0.0
+        self.queue_waits = 0
+        self.unsolicited = 0
+        self.cache_hits = 0
+        self.writes_coalesced = 0  # writes replaced by a newer value before being sent
+        self.writes_suppressed = 0  # writes skipped because the device already had the value
+        self.write_verifies = 0  # writes read back because the echo did not confirm them
+        self.write_retries = 0
+        self.read_retries = 0  # reads sent again because nothing came back
+        self.state_writes = 0  # entity state writes that showed a change
+        self.state_writes_suppressed = 0  # entity updates skipped because nothing shown changed
+        self.rtt = RttEstimator()  # over every command type on the bus
+        self._recent = deque(maxlen=RECENT_SAMPLES)
+
+    def _stats(self, kind):
+        stats = self.commands.get(kind)
+        if stats is None:
+            stats = self.commands[kind] = CommandStats()
+        return stats
+
+    def record_command(self, command, elapsed, response):
+        """Record one finished command and how long the caller waited for it."""
+        stats = self._stats(command_type(command))
+        stats.count += 1
+        stats.total_s += elapsed
+        stats.max_s = max(stats.max_s, elapsed)
+        stats.histogram[bisect_left(LATENCY_BUCKETS_MS, elapsed * 1000)] += 1
+        if not response:
+            stats.empty += 1
+        self._recent.append(elapsed)
+
+    def record_rtt(self, command, rtt):
+        """Record the time one reply took to arrive, from the write or the previous reply."""
+        self._stats(command_type(command)).rtt.sample(rtt)
+        self.rtt.sample(rtt)
+
+    def rtt_timeout(self, command):
+        """Return the measured timeout for a command type, else for the bus, else None."""
+        stats = self.commands.get(command_type(command))
+        if stats is not None and stats.rtt.samples:
+            return stats.rtt.timeout()
+        return self.rtt.timeout()
+
+    def record_timeout(self, command):
+        self._stats(command_type(command)).timeouts += 1
+
+    def record_parse_failure(self, command):
+        self._stats(command_type(command)).parse_failures += 1
+
+    def record_queue_wait(self, waited):
+        """Record how long a command waited for the bus before being written."""
+        self.queue_waits += 1
+        self.queue_wait_total_s += waited
+        self.queue_wait_max_s = max(self.queue_wait_max_s, waited)
+
+    @property
+    def total_commands(self):
+        return sum(s.count for s in self.commands.values())
+
+    @property
+    def total_timeouts(self):
+        return sum(s.timeouts for s in self.commands.values())
+
+    @property
+    def total_empty(self):
+        return sum(s.empty for s in self.commands.values())
+
+    @property
+    def total_parse_failures(self):
+        return sum(s.parse_failures for s in self.commands.values())
+
+    @property
+    def mean_queue_wait_ms(self):
+        if not self.queue_waits:
+            return None
+        return round(self.queue_wait_total_s / self.queue_waits * 1000, 2)
+
+    def latency_percentile_ms(self, pct):
+        """Return the pct-th percentile over the most recent commands, in milliseconds."""
+        if not self._recent:
+            return None
+        ordered = sorted(self._recent)
+        index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+        return round(ordered[index] * 1000, 2)
+
+    def as_dict(self):
+        return {
+            "uptime_s": round(time.time() - self.started),
+            "total_commands": self.total_commands,
+            "total_timeouts": self.total_timeouts,
+            "total_empty_responses": self.total_empty,
+            "total_parse_failures": self.total_parse_failures,
+            "latency_p50_ms": self.latency_percentile_ms(50),
+            "latency_p99_ms": self.latency_percentile_ms(99),
+            "queue_wait_mean_ms": self.mean_queue_wait_ms,
+            "queue_wait_max_ms": round(self.queue_wait_max_s * 1000, 2),
+            **self.rtt.as_dict(),
+            "unsolicited_lines": self.unsolicited,
+            "cache_hits": self.cache_hits,
+            "writes_coalesced": self.writes_coalesced,
+            "writes_suppressed": self.writes_suppressed,
+            "write_verifies": self.write_verifies,
+            "write_retries": self.write_retries,
+            "read_retries": self.read_retries,
+            "state_writes": self.state_writes,
+            "state_writes_suppressed": self.state_writes_suppressed,
+            "commands": {kind: stats.as_dict() for kind, stats in sorted(self.commands.items())},
+        }
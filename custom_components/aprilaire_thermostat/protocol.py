@@ -0,0 +1,207 @@
+"""Encoding and decoding of the Aprilaire ASCII protocol.
+
+Commands are an address, a field and ? (read) or =value (write), terminated
+by a carriage return: SN1T?, SN1SH=70, SN1M=C. Replies echo the address and
+field (SN1 T=70F, SN1 M=COOL) except for the relay state (SN1 G-Y1+W1-Y2-W2-B+O-)
+and the name (SN1Zone1), which have no field tag.
+
+Everything here works on bytes so replies can be parsed straight out of the
+read buffer, and is free of I/O so it can be used by the interface, the
+simulator and the command line tools alike.
+"""
+
+import re
+from enum import StrEnum
+from functools import lru_cache
+
+try:
+    from homeassistant.components.climate.const import HVACMode, HVACAction
+except ImportError:
+    # The interface and the command line tools also run without Home Assistant;
+    # these have the same values, so decoded replies compare equal either way.
+    class HVACMode(StrEnum):
+        OFF = "off"
+        HEAT = "heat"
+        COOL = "cool"
+        HEAT_COOL = "heat_cool"
+        AUTO = "auto"
+        DRY = "dry"
+        FAN_ONLY = "fan_only"
+
+    class HVACAction(StrEnum):
+        COOLING = "cooling"
+        DRYING = "drying"
+        FAN = "fan"
+        HEATING = "heating"
+        IDLE = "idle"
+        OFF = "off"
+        PREHEATING = "preheating"
+
+TERMINATOR = b"\r"
+
+# Relay outputs in the order the hub reports them, and their bit in Reply.relays
+RELAYS = ("G", "Y1", "W1", "Y2", "W2", "B", "O")
+RELAY_BIT = {name: 1 << i for i, name in enumerate(RELAYS)}
+RELAY_G = RELAY_BIT["G"]
+RELAY_Y1 = RELAY_BIT["Y1"]
+RELAY_W1 = RELAY_BIT["W1"]
+
+REPLY_RE = re.compile(rb"\s*(SN\d+)\s*(?:([A-Z]+)\s*=\s*(.*?)|(.*?))\s*$", re.DOTALL)
+RELAY_STATE_RE = re.compile(rb"(?:(?:G|Y1|W1|Y2|W2|B|O)[+-])+")
+RELAY_RE = re.compile(rb"(G|Y1|W1|Y2|W2|B|O)([+-])")
+
+# What the hub is doing for every combination of relays. W1 is first stage heat,
+# Y1 first stage cool and G the fan; B and O (reversing valve) do not change the action.
+ACTIONS = tuple(
+    HVACAction.HEATING if relays & RELAY_W1
+    else HVACAction.COOLING if relays & RELAY_Y1
+    else HVACAction.FAN if relays & RELAY_G
+    else HVACAction.OFF
+    for relays in range(1 << len(RELAYS))
+)
+
+MODE_ENCODE = {
+    HVACMode.COOL: "C",
+    HVACMode.HEAT: "H",
+    HVACMode.OFF: "OFF",
+    HVACMode.HEAT_COOL: "A",
+    HVACMode.FAN_ONLY: "OFF",  # No heat or cool when fan only
+}
+MODE_DECODE = {
+    b"COOL": HVACMode.COOL,
+    b"HEAT": HVACMode.HEAT,
+    b"OFF": HVACMode.OFF,
+    b"AUTO": HVACMode.HEAT_COOL,
+}
+# The mode a write leaves the thermostat in, as a read reports it
+MODE_ECHO = {
+    HVACMode.COOL: HVACMode.COOL,
+    HVACMode.HEAT: HVACMode.HEAT,
+    HVACMode.OFF: HVACMode.OFF,
+    HVACMode.HEAT_COOL: HVACMode.HEAT_COOL,
+    HVACMode.FAN_ONLY: HVACMode.OFF,
+}
+
+FAN_ENCODE = {True: "ON", False: "A"}
+FAN_ECHO = {True: "ON", False: "AUTO"}
+
+
+def _temperature(value):
+    return float(value.rstrip(b"F"))
+
+
+def _text(value):
+    return value.decode("utf-8", errors="replace")
+
+
+# Value decoder per field; anything not listed is kept as text
+DECODERS = {
+    "T": _temperature,
+    "SH": _temperature,
+    "SC": _temperature,
+    "M": MODE_DECODE.get,
+    "F": _text,
+}
+
+
+class Reply:
+    """One parsed reply or status line.
+
+    field is the protocol field ("T", "SH", "M", ...), "H" for the relay state and
+    "NAME" for a name; value is decoded (float, HVACMode, HVACAction for H, str) or
+    None if it could not be. relays is the relay bitmap of an H reply (see RELAY_BIT).
+    """
+
+    __slots__ = ("address", "field", "value", "relays")
+
+    def __init__(self, address, field, value, relays=0):
+        self.address = address
+        self.field = field
+        self.value = value
+        self.relays = relays
+
+    def __repr__(self):
+        return f"Reply({self.address}, {self.field}, {self.value!r}, relays={self.relays:#04x})"
+
+
+def parse_relays(body):
+    """Return the relay bitmap for a body like b"G-Y1+W1-Y2-W2-B+O-"."""
+    relays = 0
+    for name, state in RELAY_RE.findall(body):
+        if state == b"+":
+            relays |= RELAY_BIT[name.decode()]
+    return relays
+
+
+def parse_reply(data, pos=0, endpos=None):
+    """Parse one line of data[pos:endpos] without copying the buffer; None if it is no reply."""
+    match = REPLY_RE.match(data, pos, len(data) if endpos is None else endpos)
+    if not match:
+        return None
+    address, field, value, body = match.groups()
+    address = address.decode()
+    if field is not None:
+        field = field.decode()
+        decoder = DECODERS.get(field, _text)
+        try:
+            return Reply(address, field, decoder(bytes(value)))
+        except ValueError:
+            return Reply(address, field, None)
+    if not body:
+        return Reply(address, None, None)  # a bare address, as discovery returns
+    if RELAY_STATE_RE.fullmatch(body):
+        relays = parse_relays(body)
+        return Reply(address, "H", ACTIONS[relays], relays)
+    return Reply(address, "NAME", _text(bytes(body)))
+
+
+@lru_cache(maxsize=512)
+def parse_line(text):
+    """Parse a reply that was already decoded to text.
+
+    The bus repeats the same few hundred lines, so results are cached; treat the
+    returned Reply as read only.
+    """
+    return parse_reply(text.encode("utf-8", errors="replace"))
+
+
+@lru_cache(maxsize=1024)
+def encode(address, field, value=None):
+    """Return the command text for a read (value None) or a write of field."""
+    if value is None:
+        return f"{address}{field}?"
+    return f"{address}{field}={value}"
+
+
+class ReplyParser:
+    """Turn a byte stream into replies, parsing complete lines in one reusable buffer."""
+
+    __slots__ = ("buffer",)
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Add received bytes and return [(line text, Reply or None)] for every completed line."""
+        buffer = self.buffer
+        buffer += data
+        lines = []
+        start = 0
+        while True:
+            end = buffer.find(TERMINATOR, start)
+            if end < 0:
+                break
+            text = buffer[start:end].decode("utf-8", errors="replace").strip()
+            if text:
+                lines.append((text, parse_reply(buffer, start, end)))
+            start = end + 1
+        if start:
+            del buffer[:start]
+        return lines
+
+    def flush(self):
+        """Return what is left in the buffer as a last, unterminated line."""
+        return self.feed(TERMINATOR) if self.buffer.strip() else []
+
+    def clear(self):
+        self.buffer.clear()
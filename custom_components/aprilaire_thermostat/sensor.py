@@ -1,87 +1,153 @@
 import logging
-from homeassistant.components.sensor import SensorEntity
-from .const import DOMAIN
-from homeassistant.components.climate.const import (
-    HVACMode, HVACAction
-)
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.const import CONF_PORT, EntityCategory
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from .const import DOMAIN, SIGNAL_ZONES_ADDED
+from .entity import AprilaireEntity
 
 _LOGGER = logging.getLogger(__name__)
 
-
-
-class AprilaireTemperatureSensor(SensorEntity):
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Set up Aprilaire zone and bus diagnostic sensors based on a config entry."""
+    coordinator = await hass.data[DOMAIN][config_entry.entry_id]["discovery"]
+    if not coordinator:
+        return
+
+    added = set()
+
+    @callback
+    def async_add_zones(zones):
+        # A thermostat rediscovery missed once keeps its entities, which come back with it
+        zones = [(sn, nm) for sn, nm in zones if sn not in added]
+        added.update(sn for sn, _ in zones)
+        # The sensors share the climate platform's coordinator, so they add no bus traffic
+        sensors = [
+            AprilaireTemperatureSensor(coordinator, sn, name, config_entry.entry_id)
+            for sn, name in zones
+        ] + [
+            AprilaireModeSensor(coordinator, sn, name, config_entry.entry_id)
+            for sn, name in zones
+        ] + [
+            AprilaireActionSensor(coordinator, sn, name, config_entry.entry_id)
+            for sn, name in zones
+        ]
+        # Unique ids let the user disable a sensor, which stops polling its field
+        async_add_entities(sensors)
+
+    async_add_zones(list(zip(coordinator.thermostats, coordinator.names)))
+    async_add_entities(
+        AprilaireBusMetricSensor(coordinator, config_entry.entry_id, config_entry.data[CONF_PORT], *metric)
+        for metric in BUS_METRIC_SENSORS
+    )
+    config_entry.async_on_unload(
+        async_dispatcher_connect(hass, SIGNAL_ZONES_ADDED.format(config_entry.entry_id), async_add_zones)
+    )
+
+
+class AprilaireTemperatureSensor(AprilaireEntity, SensorEntity):
     """Sensor for the current temperature of a thermostat."""
 
-    def __init__(self, interface, sn, name):
+    _fields = ("temperature",)
+    _shown_attrs = ("_attr_native_value",)
+
+    def __init__(self, coordinator, sn, name, entry_id):
         """Initialize the temperature sensor."""
-        self._interface = interface
-        self._sn = sn
+        super().__init__(coordinator, sn)
         self._attr_name = f"Aprilaire {name} Temperature"
+        self._attr_unique_id = f"{DOMAIN}_{entry_id}_{sn}_temperature"
         self._attr_device_class = "temperature"
         self._attr_native_unit_of_measurement = "°F"
-        self._temperature = None
-
-    @property
-    def native_value(self):
-        """Return the current temperature."""
-        return self._temperature
 
-    async def async_update(self):
-        """Fetch the latest temperature."""
-        try:
-            temp = await self._interface.get_temperature(self._sn)
-            if temp and temp > 10:
-                self._temperature = temp
-        except Exception as e:
-            _LOGGER.error(f"Error updating temperature for thermostat {self._sn}: {e}")
+    def _update_attributes(self):
+        """Show the current temperature, keeping the last one over an implausible reading."""
+        temp = self._state.temperature
+        if temp and temp > 10:
+            self._attr_native_value = temp
 
 
-class AprilaireModeSensor(SensorEntity):
+class AprilaireModeSensor(AprilaireEntity, SensorEntity):
     """Sensor for the current mode of a thermostat."""
 
-    def __init__(self, interface, sn, name):
+    _fields = ("mode",)
+    _shown_attrs = ("_attr_native_value",)
+
+    def __init__(self, coordinator, sn, name, entry_id):
         """Initialize the mode sensor."""
-        self._interface = interface
-        self._sn = sn
+        super().__init__(coordinator, sn)
         self._attr_name = f"Aprilaire {name} Mode"
-        self._mode = None
+        self._attr_unique_id = f"{DOMAIN}_{entry_id}_{sn}_mode"
 
-    @property
-    def native_value(self):
-        """Return the current mode."""
-        return self._mode
+    def _update_attributes(self):
+        """Show the current mode."""
+        self._attr_native_value = self._state.mode
 
-    async def async_update(self):
-        """Fetch the latest mode."""
-        try:
-            mode = await self._interface.get_mode(self._sn)
-            if mode in HVACMode:
-                self._mode = mode
-        except Exception as e:
-            _LOGGER.error(f"Error updating mode for thermostat {self._sn}: {e}")
 
 
-
-class AprilaireActionSensor(SensorEntity):
+class AprilaireActionSensor(AprilaireEntity, SensorEntity):
     """Action for the current mode of a thermostat."""
 
-    def __init__(self, interface, sn, name):
+    _fields = ("action",)
+    _shown_attrs = ("_attr_native_value",)
+
+    def __init__(self, coordinator, sn, name, entry_id):
         """Initialize the mode sensor."""
-        self._interface = interface
-        self._sn = sn
+        super().__init__(coordinator, sn)
         self._attr_name = f"Aprilaire {name} Action"
-        self._action = None
+        self._attr_unique_id = f"{DOMAIN}_{entry_id}_{sn}_action"
+
+    def _update_attributes(self):
+        """Show the current action."""
+        self._attr_native_value = self._state.action
+
+
+# (key, name, unit, state class, value from BusMetrics)
+BUS_METRIC_SENSORS = [
+    ("commands", "Commands", None, SensorStateClass.TOTAL_INCREASING, lambda m: m.total_commands),
+    ("timeouts", "Timeouts", None, SensorStateClass.TOTAL_INCREASING, lambda m: m.total_timeouts),
+    ("empty_responses", "Empty Responses", None, SensorStateClass.TOTAL_INCREASING, lambda m: m.total_empty),
+    ("parse_failures", "Parse Failures", None, SensorStateClass.TOTAL_INCREASING, lambda m: m.total_parse_failures),
+    ("latency_p50", "Command Latency p50", "ms", SensorStateClass.MEASUREMENT, lambda m: m.latency_percentile_ms(50)),
+    ("latency_p99", "Command Latency p99", "ms", SensorStateClass.MEASUREMENT, lambda m: m.latency_percentile_ms(99)),
+    ("queue_wait", "Queue Wait", "ms", SensorStateClass.MEASUREMENT, lambda m: m.mean_queue_wait_ms),
+    ("state_writes_suppressed", "Suppressed State Writes", None, SensorStateClass.TOTAL_INCREASING,
+     lambda m: m.state_writes_suppressed),
+]
+
+
+class AprilaireBusMetricSensor(CoordinatorEntity, SensorEntity):
+    """Diagnostic sensor for one serial bus statistic, refreshed every coordinator tick.
+
+    The coordinator only notifies its entities when the thermostat data changes, while the
+    statistics move with every command, so the sensor keeps its own timer at the same interval.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator, entry_id, port, key, name, unit, state_class, value):
+        """Initialize the bus metric sensor."""
+        super().__init__(coordinator)
+        self._value = value
+        # The port tells the buses apart when there are several hubs
+        self._attr_name = f"Aprilaire Bus {name} ({port})"
+        self._attr_unique_id = f"{DOMAIN}_{entry_id}_bus_{key}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+
+    async def async_added_to_hass(self):
+        """Refresh on the coordinator's interval as well as on its updates."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_track_time_interval(self.hass, self._async_refresh, self.coordinator.update_interval)
+        )
+
+    @callback
+    def _async_refresh(self, now):
+        self.async_write_ha_state()
 
     @property
     def native_value(self):
-        """Return the current mode."""
-        return self._action
-
-    async def async_update(self):
-        """Fetch the latest mode."""
-        try:
-            action = await self._interface.get_state(self._sn)
-            if action in HVACAction:
-                self._action = action
-        except Exception as e:
-            _LOGGER.error(f"Error updating action for thermostat {self._sn}: {e}")
\ No newline at end of file
+        """Return the current value of the statistic."""
+        return self._value(self.coordinator.interface.metrics)
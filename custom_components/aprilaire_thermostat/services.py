@@ -0,0 +1,124 @@
+"""Services of the integration.
+
+bulk_set changes many zones at once, e.g. every zone to COOL or to away
+setpoints. The writes for all zones on a bus are queued together, so they go
+out as a few pipelined batches instead of one command round trip per entity.
+"""
+
+import asyncio
+import logging
+
+import voluptuous as vol
+from homeassistant.components.climate.const import ATTR_FAN_MODE, ATTR_HVAC_MODE, FAN_AUTO, FAN_ON, HVACMode
+from homeassistant.const import ATTR_ENTITY_ID, UnitOfTemperature
+from homeassistant.core import SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.util.unit_conversion import TemperatureConverter
+
+from .aprilair_serial_interface import SETPOINT_FIELDS, UPDATE_FIELDS
+from .climate import SUPPORTED_HVAC_MODES
+from .const import (
+    DOMAIN, SERVICE_BULK_SET, ATTR_HEAT_SETPOINT, ATTR_COOL_SETPOINT, SIGNAL_ZONE_WRITTEN
+)
+from .protocol import FAN_ECHO, FAN_ENCODE, MODE_ECHO, MODE_ENCODE
+
+_LOGGER = logging.getLogger(__name__)
+
+BULK_SET_SCHEMA = vol.All(
+    vol.Schema({
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Optional(ATTR_HVAC_MODE): vol.All(vol.Coerce(HVACMode), vol.In(SUPPORTED_HVAC_MODES)),
+        vol.Optional(ATTR_HEAT_SETPOINT): vol.Coerce(float),
+        vol.Optional(ATTR_COOL_SETPOINT): vol.Coerce(float),
+        vol.Optional(ATTR_FAN_MODE): vol.In([FAN_ON, FAN_AUTO]),
+    }),
+    cv.has_at_least_one_key(ATTR_HVAC_MODE, ATTR_HEAT_SETPOINT, ATTR_COOL_SETPOINT, ATTR_FAN_MODE),
+)
+
+
+def async_setup_services(hass):
+    """Register the integration's services."""
+    async def async_bulk_set(call):
+        return await _async_bulk_set(hass, call)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_BULK_SET, async_bulk_set, schema=BULK_SET_SCHEMA, supports_response=SupportsResponse.OPTIONAL
+    )
+
+
+def _field_writes(hass, data):
+    """Return (attribute, field, value, expected echo) for each change asked for, in sending order."""
+    writes = []
+    if ATTR_HVAC_MODE in data:
+        mode = data[ATTR_HVAC_MODE]
+        writes.append((ATTR_HVAC_MODE, "M", MODE_ENCODE[mode], MODE_ECHO[mode]))
+    setpoints = {}
+    for attr, mode in ((ATTR_HEAT_SETPOINT, HVACMode.HEAT), (ATTR_COOL_SETPOINT, HVACMode.COOL)):
+        if attr in data:
+            # The thermostats take whole degrees Fahrenheit
+            value = round(TemperatureConverter.convert(
+                data[attr], hass.config.units.temperature_unit, UnitOfTemperature.FAHRENHEIT
+            ))
+            setpoints[attr] = value
+            writes.append((attr, SETPOINT_FIELDS[mode], value, float(value)))
+    if len(setpoints) == 2 and setpoints[ATTR_HEAT_SETPOINT] >= setpoints[ATTR_COOL_SETPOINT]:
+        raise ServiceValidationError(f"{ATTR_HEAT_SETPOINT} must be below {ATTR_COOL_SETPOINT}")
+    if ATTR_FAN_MODE in data:
+        on = data[ATTR_FAN_MODE] == FAN_ON
+        writes.append((ATTR_FAN_MODE, "F", FAN_ENCODE[on], FAN_ECHO[on]))
+    return writes
+
+
+def _coordinator(hass, entry_id):
+    discovery = hass.data.get(DOMAIN, {}).get(entry_id, {}).get("discovery")
+    if discovery and discovery.done() and not discovery.cancelled() and not discovery.exception():
+        return discovery.result()
+    return None
+
+
+async def _async_bulk_set(hass, call):
+    """Apply one change to many zones and return {"zones": {entity_id: result}}."""
+    writes = _field_writes(hass, call.data)
+    registry = er.async_get(hass)
+    results = {}
+    buses = {}  # entry_id -> (coordinator, [(entity_id, sn)])
+    for entity_id in call.data[ATTR_ENTITY_ID]:
+        entry = registry.async_get(entity_id)
+        coordinator = None
+        if entry and entry.platform == DOMAIN and entry.domain == "climate":
+            coordinator = _coordinator(hass, entry.config_entry_id)
+        # Climate unique ids end with the thermostat's address
+        sn = entry.unique_id.rpartition("_")[2] if coordinator else None
+        if not coordinator or sn not in coordinator.thermostats:
+            results[entity_id] = {"success": False, "error": "not a connected Aprilaire thermostat"}
+            continue
+        buses.setdefault(entry.config_entry_id, (coordinator, []))[1].append((entity_id, sn))
+
+    await asyncio.gather(*(
+        _async_bulk_set_bus(hass, entry_id, coordinator, zones, writes, results)
+        for entry_id, (coordinator, zones) in buses.items()
+    ))
+    return {"zones": results}
+
+
+async def _async_bulk_set_bus(hass, entry_id, coordinator, zones, writes, results):
+    """Send the writes for every zone on one bus as one burst and record how each zone did."""
+    reported = await coordinator.interface.write_many([
+        (sn, field, value, expect) for _, sn in zones for _, field, value, expect in writes
+    ])
+    for entity_id, sn in zones:
+        coordinator.async_note_write(sn)
+        failed = [attr for attr, field, _, expect in writes if reported[(sn, field)] != expect]
+        if failed:
+            _LOGGER.warning(f"Bulk set of {failed} was not confirmed by {sn} ({entity_id})")
+        # The climate entity keeps its own mode and setpoints, so it is told what took
+        written = {
+            UPDATE_FIELDS[field]: expect
+            for attr, field, _, expect in writes if field in UPDATE_FIELDS and attr not in failed
+        }
+        if written:
+            async_dispatcher_send(hass, SIGNAL_ZONE_WRITTEN.format(entry_id, sn), written)
+        results[entity_id] = {"success": not failed, "failed": failed}
@@ -0,0 +1,215 @@
+"""In-process simulation of an Aprilaire 8870-style hub for tests and benchmarks.
+
+The simulator answers the same ASCII protocol the serial interface speaks
+(SN1T?, SN1M=C, SN1SH=70, SN?#, ...). Replies are sent one command at a
+time, like the real hub, after a configurable latency plus random jitter.
+It can be reached through an asyncio stream pair, a pty (so pyserial
+opens it like a real port) or a local TCP socket.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import re
+import socket
+import tty
+
+_LOGGER = logging.getLogger(__name__)
+
+COMMAND_RE = re.compile(r"(SN\d+)\s*([A-Z]+)\s*([?=])\s*(.*)")
+
+MODE_SET = {"C": "COOL", "H": "HEAT", "A": "AUTO", "OFF": "OFF"}
+FAN_SET = {"ON": "ON", "A": "AUTO"}
+
+
+class SimulatedZone:
+    """State of one simulated thermostat."""
+
+    def __init__(self, name, temperature=70, mode="COOL", setpoint_heat=68, setpoint_cool=75):
+        self.name = name
+        self.temperature = temperature
+        self.mode = mode
+        self.setpoint_heat = setpoint_heat
+        self.setpoint_cool = setpoint_cool
+        self.fan = "AUTO"
+
+    @property
+    def relays(self):
+        """Return the H? relay string implied by the mode, setpoints and temperature."""
+        heat = self.mode in ("HEAT", "AUTO") and self.temperature < self.setpoint_heat
+        cool = self.mode in ("COOL", "AUTO") and self.temperature > self.setpoint_cool
+        fan = heat or cool or self.fan == "ON"
+
+        def on(flag):
+            return "+" if flag else "-"
+
+        return f"G{on(fan)}Y1{on(cool)}W1{on(heat)}Y2-W2-B+O-"
+
+
+class AprilaireSimulator:
+    """A simulated hub with a configurable number of zones and per-command latency."""
+
+    def __init__(self, zones=8, latency=0.005, jitter=0.0, seed=None):
+        self.zones = {f"SN{i}": SimulatedZone(f"Zone{i}") for i in range(1, zones + 1)}
+        self.latency = latency
+        self.jitter = jitter
+        self.commands = 0  # commands answered so far
+        self._random = random.Random(seed)
+        self._tasks = []
+        self._closers = []
+        self._writers = []  # one per connected client, used for broadcasts
+        self._clients = []  # TCP client streams, closed by drop_clients()
+
+    def handle(self, command):
+        """Return the reply lines for one command; unknown commands get no reply."""
+        command = command.strip()
+        if command == "SN?#":
+            return list(self.zones)
+        match = COMMAND_RE.fullmatch(command)
+        if not match:
+            return []
+        sn, field, op, value = match.groups()
+        zone = self.zones.get(sn)
+        if zone is None:
+            return []
+
+        if op == "=":
+            if field == "M" and value in MODE_SET:
+                zone.mode = MODE_SET[value]
+            elif field == "F" and value in FAN_SET:
+                zone.fan = FAN_SET[value]
+            elif field in ("SH", "SC") and value.isdigit():
+                setattr(zone, "setpoint_heat" if field == "SH" else "setpoint_cool", int(value))
+            else:
+                return []
+        reply = self.status_line(sn, field)
+        return [reply] if reply else []
+
+    def status_line(self, sn, field):
+        """Return the line the hub sends for one field, as a reply or a broadcast."""
+        zone = self.zones[sn]
+        if field == "T":
+            return f"{sn} T={zone.temperature}F"
+        if field == "H":
+            return f"{sn} {zone.relays}"
+        if field == "M":
+            return f"{sn} M={zone.mode}"
+        if field == "F":
+            return f"{sn} F={zone.fan}"
+        if field == "SH":
+            return f"{sn} SH={zone.setpoint_heat}"
+        if field == "SC":
+            return f"{sn} SC={zone.setpoint_cool}"
+        if field == "NAME":
+            return f"{sn}{zone.name}"
+        return None
+
+    async def _answer(self, command, write):
+        await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+        replies = self.handle(command)
+        self.commands += 1
+        if replies:
+            write("".join(f"{line}\r" for line in replies).encode())
+
+    async def _serve(self, commands, write):
+        """Answer queued commands one at a time, like the hub's single processor."""
+        while True:
+            command = await commands.get()
+            try:
+                await self._answer(command, write)
+            except Exception as e:
+                _LOGGER.error(f"Simulator failed on {command}: {e}")
+
+    def _start(self, write):
+        """Start a worker and return a feed(bytes) callback for incoming data."""
+        commands = asyncio.Queue()
+        buffer = bytearray()
+
+        def feed(data):
+            buffer.extend(data)
+            while b"\r" in buffer:
+                line, _, rest = bytes(buffer).partition(b"\r")
+                buffer[:] = rest
+                if line.strip():
+                    commands.put_nowait(line.decode("utf-8", errors="replace"))
+
+        self._tasks.append(asyncio.get_running_loop().create_task(self._serve(commands, write)))
+        self._writers.append(write)
+        return feed
+
+    def broadcast(self, sn, field):
+        """Send an unsolicited status line, as the hub does when a wall thermostat changes."""
+        line = self.status_line(sn, field)
+        for write in self._writers:
+            write(f"{line}\r".encode())
+
+    async def open_connection(self):
+        """Return a (reader, writer) stream pair connected to the simulator."""
+        client, server = socket.socketpair()
+        server_reader, server_writer = await asyncio.open_connection(sock=server)
+        feed = self._start(server_writer.write)
+        self._tasks.append(asyncio.get_running_loop().create_task(self._pump(server_reader, feed)))
+        self._closers.append(server_writer.close)
+        return await asyncio.open_connection(sock=client)
+
+    async def _pump(self, reader, feed):
+        while True:
+            data = await reader.read(1024)
+            if not data:
+                return
+            feed(data)
+
+    def open_pty(self):
+        """Serve the simulator on a new pty and return the device path to open as a serial port."""
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        feed = self._start(lambda data: os.write(master, data))
+        loop = asyncio.get_running_loop()
+
+        def on_readable():
+            try:
+                data = os.read(master, 1024)
+            except OSError:
+                loop.remove_reader(master)
+                return
+            feed(data)
+
+        loop.add_reader(master, on_readable)
+
+        def close():
+            loop.remove_reader(master)
+            os.close(master)
+            os.close(slave)
+
+        self._closers.append(close)
+        return os.ttyname(slave)
+
+    async def start_tcp(self, host="127.0.0.1", port=0):
+        """Serve the simulator over TCP, as ser2net would, and return the bound port."""
+        async def client_connected(reader, writer):
+            feed = self._start(writer.write)
+            self._clients.append(writer)
+            await self._pump(reader, feed)
+
+        server = await asyncio.start_server(client_connected, host, port)
+        self._closers.append(server.close)
+        return server.sockets[0].getsockname()[1]
+
+    def drop_clients(self):
+        """Disconnect every TCP client, like a cable glitch; the server keeps listening."""
+        for writer in self._clients:
+            writer.close()
+        self._clients.clear()
+
+    async def close(self):
+        """Stop all workers and close every endpoint."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self.drop_clients()
+        for close in self._closers:
+            close()
+        self._closers.clear()
+        self._writers.clear()
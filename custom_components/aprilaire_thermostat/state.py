@@ -0,0 +1,99 @@
+"""Compact, validated state of one thermostat, shared by all of its entities."""
+
+import logging
+import math
+
+from homeassistant.components.climate.const import HVACMode, HVACAction
+
+from .protocol import FAN_ECHO
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _temperature(value):
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"{value} is not a temperature")
+    return value
+
+
+def _fan(value):
+    if value not in FAN_ECHO.values():
+        raise ValueError(f"{value} is not a fan setting")
+    return value
+
+
+# Converter per snapshot field; a value it rejects is logged once and ignored
+VALIDATORS = {
+    "temperature": _temperature,
+    "setpoint_heat": _temperature,
+    "setpoint_cool": _temperature,
+    "mode": HVACMode,
+    "fan": _fan,
+    "action": HVACAction,
+}
+FIELDS = tuple(VALIDATORS)
+
+
+class ThermostatState:
+    """Temperature, action, mode, fan and setpoints of one thermostat.
+
+    The coordinator keeps one per thermostat in its snapshot. Values are converted
+    and checked once, when they arrive from the bus, so entities can precompute
+    their attributes from plain, valid fields. A record is replaced, not changed,
+    when a new value arrives, so entities can tell a new snapshot by identity.
+    """
+
+    __slots__ = FIELDS + ("sn", "stale", "_raw")
+
+    def __init__(self, sn):
+        self.sn = sn
+        # None until a valid value arrives
+        self.temperature = None
+        self.action = None
+        self.mode = None
+        self.fan = None  # "ON" or "AUTO", as the thermostat reports it
+        self.setpoint_heat = None
+        self.setpoint_cool = None
+        self.stale = False  # restored from the last run and not confirmed by the bus yet
+        self._raw = {}  # field -> value last received, valid or not
+
+    def apply(self, field, raw):
+        """Take a value received for a field; returns True if the field changed."""
+        if raw is None or self._raw.get(field) == raw:
+            return False
+        self._raw[field] = raw
+        try:
+            value = VALIDATORS[field](raw)
+        except (TypeError, ValueError):
+            _LOGGER.error(f"{self.sn}: ignoring invalid {field} {raw!r}")
+            return False
+        if getattr(self, field) == value:
+            return False
+        setattr(self, field, value)
+        return True
+
+    def copy(self):
+        """Return a copy to apply new values to."""
+        state = ThermostatState(self.sn)
+        for field in FIELDS:
+            setattr(state, field, getattr(self, field))
+        state.stale = self.stale
+        state._raw = dict(self._raw)
+        return state
+
+    def as_dict(self):
+        """Return the known fields, as stored between runs and shown in diagnostics."""
+        return {field: getattr(self, field) for field in FIELDS if getattr(self, field) is not None}
+
+    def __eq__(self, other):
+        if not isinstance(other, ThermostatState):
+            return NotImplemented
+        return self.sn == other.sn and self.stale == other.stale and all(
+            getattr(self, field) == getattr(other, field) for field in FIELDS
+        )
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"ThermostatState({self.sn}, {self.as_dict()}, stale={self.stale})"
@@ -0,0 +1,236 @@
+"""Transports the interface can open besides a local pyserial port.
+
+A hub behind a serial server (ser2net in raw mode, a USR/Moxa box, ...) is
+reached with a tcp://host:port URL. The socket is tuned for a request/reply
+protocol of a few bytes per command: Nagle is turned off so each batch of
+commands leaves as one segment right away, and keepalive makes a silently
+dropped connection fail within a minute instead of hanging the bus.
+
+A local port can also be opened natively with tty:///dev/ttyUSB0: the fd is
+put in raw mode with termios, the driver is asked for low latency (which makes
+FTDI adapters drop their 16 ms latency timer) and the event loop reads it
+directly into one reusable buffer, whole replies at a time.
+"""
+
+import asyncio
+import fcntl
+import logging
+import os
+import socket
+import struct
+import termios
+
+_LOGGER = logging.getLogger(__name__)
+
+TRANSPORT_SERIAL = "serial"
+TRANSPORT_TCP = "tcp"
+TRANSPORT_RFC2217 = "rfc2217"  # handled by pyserial's rfc2217:// URL
+TRANSPORT_TTY = "tty"  # native low latency serial
+TRANSPORTS = [TRANSPORT_SERIAL, TRANSPORT_TTY, TRANSPORT_TCP, TRANSPORT_RFC2217]
+
+TCP_SCHEME = "tcp://"
+CONNECT_TIMEOUT = 5  # seconds
+KEEPALIVE_IDLE = 30  # seconds of silence before the first probe
+KEEPALIVE_INTERVAL = 10
+KEEPALIVE_COUNT = 3
+USER_TIMEOUT_MS = 30000  # unacknowledged data fails the connection after this long
+
+TTY_SCHEME = "tty://"
+READ_CHUNK = 4096  # bytes per read; a whole discovery reply fits in one
+# Linux serial_struct access, for the ASYNC_LOW_LATENCY flag
+TIOCGSERIAL = 0x541E
+TIOCSSERIAL = 0x541F
+SERIAL_FLAGS_OFFSET = 16  # after int type, int line, unsigned int port, int irq
+ASYNC_LOW_LATENCY = 1 << 13
+
+
+def transport_url(transport, port):
+    """Return the URL the interface opens for a transport and a port or host:port."""
+    if transport == TRANSPORT_TCP and "://" not in port:
+        return f"{TCP_SCHEME}{port}"
+    if transport == TRANSPORT_RFC2217 and "://" not in port:
+        return f"rfc2217://{port}"
+    if transport == TRANSPORT_TTY and "://" not in port:
+        return f"{TTY_SCHEME}{port}"
+    return port
+
+
+def is_tcp_url(url):
+    return url.startswith(TCP_SCHEME)
+
+
+def is_tty_url(url):
+    return url.startswith(TTY_SCHEME)
+
+
+def split_host_port(url):
+    """Return (host, port) from tcp://host:port."""
+    host, _, port = url[len(TCP_SCHEME):].rstrip("/").rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Expected {TCP_SCHEME}host:port, got {url}")
+    return host.strip("[]"), int(port)
+
+
+def tune_socket(sock):
+    """Set the low latency and dead peer detection options on a connected TCP socket."""
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # Not every platform has the fine grained options
+    for option, value in (
+        ("TCP_KEEPIDLE", KEEPALIVE_IDLE),
+        ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL),
+        ("TCP_KEEPCNT", KEEPALIVE_COUNT),
+        ("TCP_USER_TIMEOUT", USER_TIMEOUT_MS),
+    ):
+        if hasattr(socket, option):
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+            except OSError as e:
+                _LOGGER.debug(f"Could not set {option}: {e}")
+
+
+async def open_tcp_connection(url, timeout=CONNECT_TIMEOUT):
+    """Open a tuned stream pair to a tcp://host:port serial server."""
+    host, port = split_host_port(url)
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    sock = writer.get_extra_info("socket")
+    if sock is not None:
+        tune_socket(sock)
+    return reader, writer
+
+
+def configure_tty(fd, baudrate):
+    """Put a tty in raw 8N1 mode at baudrate, waking readers on the first byte."""
+    speed = getattr(termios, f"B{baudrate}", None)
+    if speed is None:
+        raise ValueError(f"Unsupported baud rate {baudrate}")
+    iflag, oflag, cflag, lflag, ispeed, ospeed, cc = termios.tcgetattr(fd)
+    # No input or output processing: a CR must stay a CR, and nothing is echoed
+    iflag = 0
+    oflag = 0
+    lflag = 0
+    cflag = termios.CS8 | termios.CREAD | termios.CLOCAL
+    cc[termios.VMIN] = 1
+    cc[termios.VTIME] = 0  # no inter-byte timer holding data back
+    termios.tcsetattr(fd, termios.TCSANOW, [iflag, oflag, cflag, lflag, speed, speed, cc])
+    termios.tcflush(fd, termios.TCIOFLUSH)  # drop whatever was left over from before
+
+
+def set_low_latency(fd):
+    """Ask the driver to hand received bytes over at once; returns False where unsupported."""
+    buffer = bytearray(128)  # larger than serial_struct on every architecture
+    try:
+        fcntl.ioctl(fd, TIOCGSERIAL, buffer, True)
+        flags = struct.unpack_from("i", buffer, SERIAL_FLAGS_OFFSET)[0]
+        struct.pack_into("i", buffer, SERIAL_FLAGS_OFFSET, flags | ASYNC_LOW_LATENCY)
+        fcntl.ioctl(fd, TIOCSSERIAL, buffer)
+    except OSError as e:
+        # ptys and some drivers have no serial_struct
+        _LOGGER.debug(f"Low latency mode not available: {e}")
+        return False
+    return True
+
+
+class TtyTransport(asyncio.Transport):
+    """Asyncio transport over a non-blocking tty fd, watched with add_reader."""
+
+    def __init__(self, loop, fd, protocol, path):
+        super().__init__({"path": path})
+        self._loop = loop
+        self._fd = fd
+        self._protocol = protocol
+        self._buffer = bytearray(READ_CHUNK)
+        self._view = memoryview(self._buffer)
+        self._pending = bytearray()  # written data the driver has not taken yet
+        self._closing = False
+        loop.add_reader(fd, self._read_ready)
+
+    def _read_ready(self):
+        try:
+            count = os.readv(self._fd, [self._buffer])
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self._fatal(e)
+            return
+        if not count:
+            self._fatal(None)  # hangup
+            return
+        # The stream reader copies the bytes into its own buffer, so ours is reused
+        self._protocol.data_received(self._view[:count])
+
+    def write(self, data):
+        if self._closing or not data:
+            return
+        if not self._pending:
+            try:
+                written = os.write(self._fd, data)
+            except (BlockingIOError, InterruptedError):
+                written = 0
+            except OSError as e:
+                self._fatal(e)
+                return
+            if written == len(data):
+                return
+            data = data[written:]
+            self._loop.add_writer(self._fd, self._write_ready)
+        self._pending += data
+
+    def _write_ready(self):
+        try:
+            written = os.write(self._fd, self._pending)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self._fatal(e)
+            return
+        del self._pending[:written]
+        if not self._pending:
+            self._loop.remove_writer(self._fd)
+
+    def get_write_buffer_size(self):
+        return len(self._pending)
+
+    def can_write_eof(self):
+        return False
+
+    def is_closing(self):
+        return self._closing
+
+    def close(self):
+        self._close(None)
+
+    def abort(self):
+        self._close(None)
+
+    def _fatal(self, error):
+        if error:
+            _LOGGER.debug(f"Error on {self.get_extra_info('path')}: {error}")
+        self._close(error)
+
+    def _close(self, error):
+        if self._closing:
+            return
+        self._closing = True
+        self._loop.remove_reader(self._fd)
+        self._loop.remove_writer(self._fd)
+        os.close(self._fd)
+        self._loop.call_soon(self._protocol.connection_lost, error)
+
+
+async def open_tty_connection(url, baudrate):
+    """Open a tty:///dev/... port natively and return a (reader, writer) stream pair."""
+    path = url[len(TTY_SCHEME):]
+    loop = asyncio.get_running_loop()
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    try:
+        configure_tty(fd, baudrate)
+        set_low_latency(fd)
+    except Exception:
+        os.close(fd)
+        raise
+    reader = asyncio.StreamReader(loop=loop)
+    protocol = asyncio.StreamReaderProtocol(reader, loop=loop)
+    transport = TtyTransport(loop, fd, protocol, path)
+    protocol.connection_made(transport)
+    return reader, asyncio.StreamWriter(transport, protocol, reader, loop)
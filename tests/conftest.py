@@ -0,0 +1,52 @@
+"""Fixtures for the Aprilaire thermostat tests."""
+
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.aprilaire_thermostat.const import DOMAIN
+from custom_components.aprilaire_thermostat.simulator import AprilaireSimulator
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Let hass load the integration from custom_components."""
+    yield
+
+
+@pytest.fixture
+async def simulator():
+    """Return a simulated hub with two zones."""
+    simulator = AprilaireSimulator(2, latency=0.001)
+    yield simulator
+    await simulator.close()
+
+
+@pytest.fixture
+async def setup_entry(hass, simulator):
+    """Return a coroutine that sets up a config entry whose serial port is the simulator."""
+    entries = []
+
+    async def open_simulator(url, baudrate, **kwargs):
+        return await simulator.open_connection()
+
+    async def setup(data=None, version=2, entry_id=None):
+        entry = MockConfigEntry(
+            domain=DOMAIN, version=version, entry_id=entry_id,
+            data={"port": "/dev/null", "baudrate": 9600, **(data or {})},
+        )
+        entry.add_to_hass(hass)
+        with patch(
+            "custom_components.aprilaire_thermostat.aprilair_serial_interface.open_serial_connection",
+            open_simulator,
+        ):
+            assert await hass.config_entries.async_setup(entry.entry_id)
+            await hass.async_block_till_done()
+        entries.append(entry)
+        return entry
+
+    yield setup
+    for entry in entries:
+        await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
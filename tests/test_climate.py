@@ -0,0 +1,87 @@
+"""Tests for the climate entities."""
+
+import asyncio
+
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util.unit_system import US_CUSTOMARY_SYSTEM
+
+from custom_components.aprilaire_thermostat.const import CONF_BIDIRECTIONAL, CONF_PUSH, DOMAIN
+
+ENTITY = "climate.aprilaire_thermostat_sn1_zone1"
+
+
+async def settle(hass):
+    await asyncio.sleep(0.05)
+    await hass.async_block_till_done()
+
+
+async def test_wall_changes_are_shown(hass, simulator, setup_entry):
+    hass.config.units = US_CUSTOMARY_SYSTEM
+    await setup_entry({CONF_PUSH: True})
+    assert hass.states.get(ENTITY).attributes["temperature"] == 75
+
+    zone = simulator.zones["SN1"]
+    zone.setpoint_cool = 80
+    zone.fan = "ON"
+    simulator.broadcast("SN1", "SC")
+    simulator.broadcast("SN1", "F")
+    await settle(hass)
+    state = hass.states.get(ENTITY)
+    assert state.attributes["temperature"] == 80
+    assert state.attributes["fan_mode"] == "on"
+
+
+async def test_bidirectional_flag_is_migrated(hass, setup_entry):
+    entry = await setup_entry({"bidrectional": True}, version=1)
+    assert entry.version == 2
+    assert entry.data[CONF_BIDIRECTIONAL] is True
+    assert "bidrectional" not in entry.data
+
+
+async def test_invalid_reading_is_logged_once(hass, setup_entry, caplog):
+    entry = await setup_entry()
+    coordinator = hass.data[DOMAIN][entry.entry_id]["discovery"].result()
+    shown = hass.states.get(ENTITY).attributes["current_temperature"]
+
+    coordinator.async_handle_push("SN1", "temperature", "garbage")
+    coordinator.async_update_listeners()
+    await hass.async_block_till_done()
+    errors = [r for r in caplog.records if "invalid temperature" in r.getMessage()]
+    assert len(errors) == 1
+    assert hass.states.get(ENTITY).attributes["current_temperature"] == shown
+
+
+async def test_missing_thermostat_is_unavailable_until_it_returns(hass, simulator, setup_entry):
+    entry = await setup_entry()
+    coordinator = hass.data[DOMAIN][entry.entry_id]["discovery"].result()
+    entity = "climate.aprilaire_thermostat_sn2_zone2"
+    zone = simulator.zones.pop("SN2")
+    await coordinator.async_rediscover()
+    await hass.async_block_till_done()
+    assert hass.states.get(entity).state == "unavailable"
+    assert er.async_get(hass).async_get(entity)
+
+    simulator.zones["SN2"] = zone
+    await coordinator.async_rediscover()
+    await hass.async_block_till_done()
+    assert hass.states.get(entity).state == "cool"
+    assert len(hass.states.async_entity_ids("climate")) == 2
+
+
+async def test_unchanged_state_is_not_written(hass, setup_entry):
+    entry = await setup_entry()
+    coordinator = hass.data[DOMAIN][entry.entry_id]["discovery"].result()
+    metrics = coordinator.interface.metrics
+    updated = hass.states.get(ENTITY).last_updated
+    writes, suppressed = metrics.state_writes, metrics.state_writes_suppressed
+
+    coordinator.async_update_listeners()
+    await hass.async_block_till_done()
+    assert hass.states.get(ENTITY).last_updated == updated
+    assert metrics.state_writes == writes
+    assert metrics.state_writes_suppressed > suppressed
+
+    coordinator.async_handle_push("SN1", "temperature", 80.0)
+    await hass.async_block_till_done()
+    assert hass.states.get(ENTITY).last_updated > updated
+    assert metrics.state_writes > writes
@@ -0,0 +1,124 @@
+"""Tests for the coordinator's polling of the bus."""
+
+import asyncio
+
+import pytest
+from homeassistant.components.climate.const import HVACAction
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.aprilaire_thermostat.aprilair_serial_interface import AprilaireThermostatSerialInterface
+from custom_components.aprilaire_thermostat.const import CONF_BIDIRECTIONAL, DOMAIN, STORAGE_VERSION
+from custom_components.aprilaire_thermostat.coordinator import FAST_POLL_WINDOW, AprilaireCoordinator
+from custom_components.aprilaire_thermostat.state import ThermostatState
+
+ENTITY = "climate.aprilaire_thermostat_sn1_zone1"
+
+
+def record_commands(simulator):
+    """Return the list the simulator appends every command it answers to."""
+    commands = []
+    handle = simulator.handle
+
+    def recording(command):
+        commands.append(command.strip())
+        return handle(command)
+
+    simulator.handle = recording
+    return commands
+
+
+async def poll(coordinator, sn):
+    """Make a thermostat due, as if its cached settings had expired, and run one coordinator tick."""
+    coordinator.interface.invalidate(sn)
+    coordinator._next_poll[sn] = 0
+    await coordinator.async_refresh()
+
+
+async def test_settings_are_read_once(hass, simulator, setup_entry):
+    entry = await setup_entry()
+    coordinator = hass.data[DOMAIN][entry.entry_id]["discovery"].result()
+    commands = record_commands(simulator)
+    await poll(coordinator, "SN1")
+    assert not [command for command in commands if command[3:] in ("F?", "SH?", "SC?")]
+
+
+async def test_settings_are_polled_when_bidirectional(hass, simulator, setup_entry):
+    entry = await setup_entry({CONF_BIDIRECTIONAL: True})
+    coordinator = hass.data[DOMAIN][entry.entry_id]["discovery"].result()
+    commands = record_commands(simulator)
+    await poll(coordinator, "SN1")
+    assert {"SN1F?", "SN1SH?", "SN1SC?"} <= set(commands)
+
+
+async def test_disabled_sensor_is_not_polled(hass, simulator, setup_entry):
+    entry = await setup_entry()
+    coordinator = hass.data[DOMAIN][entry.entry_id]["discovery"].result()
+    commands = record_commands(simulator)
+    await poll(coordinator, "SN1")
+    assert "SN1M?" in commands
+
+    er.async_get(hass).async_update_entity(
+        "sensor.aprilaire_zone1_mode", disabled_by=er.RegistryEntryDisabler.USER
+    )
+    await hass.async_block_till_done()
+    commands.clear()
+    await poll(coordinator, "SN1")
+    assert commands == ["SN1T?", "SN1H?"]
+
+
+async def test_restored_snapshot_is_stale_until_polled(hass, hass_storage, simulator, setup_entry):
+    key = f"{DOMAIN}.saved"
+    snapshot = {"temperature": 68.0, "action": "off", "mode": "heat", "setpoint_heat": 66.0}
+    hass_storage[key] = {"version": STORAGE_VERSION, "minor_version": 1, "key": key, "data": {
+        "thermostats": ["SN1", "SN2"], "names": ["Zone1", "Zone2"],
+        # SN2 was heating when HA stopped, so it is confirmed first
+        "snapshot": {"SN1": snapshot, "SN2": {**snapshot, "action": "heating"}},
+    }}
+    commands = record_commands(simulator)
+    await setup_entry(entry_id="saved")
+    state = hass.states.get(ENTITY)
+    assert state.attributes["current_temperature"] == 20.0
+    assert state.attributes["stale"] is True
+
+    await asyncio.sleep(0.1)
+    await hass.async_block_till_done()
+    assert commands[0].startswith("SN2")
+    state = hass.states.get(ENTITY)
+    assert state.attributes["current_temperature"] == 21.1  # the simulator's 70°F
+    assert state.attributes["stale"] is False
+
+
+@pytest.fixture
+def coordinator(hass):
+    """Return a coordinator for two thermostats that is never refreshed."""
+    interface = AprilaireThermostatSerialInterface("test")
+    return AprilaireCoordinator(hass, interface, ["SN1", "SN2"], ["Zone1", "Zone2"], polling_interval=60)
+
+
+def schedule(coordinator, sn, now, polled=1, action=HVACAction.OFF):
+    state = ThermostatState(sn)
+    state.action = action
+    coordinator._schedule(sn, state, now, polled)
+    return coordinator._next_poll[sn] - now
+
+
+async def test_idle_thermostat_backs_off_to_the_polling_interval(coordinator):
+    assert [schedule(coordinator, "SN1", 0) for _ in range(4)] == [20, 40, 60, 60]
+    assert schedule(coordinator, "SN1", 0, action=HVACAction.HEATING) == 10
+
+
+async def test_first_polls_are_spread_over_one_interval(coordinator):
+    assert schedule(coordinator, "SN1", 0, polled=2) == 10
+    assert schedule(coordinator, "SN2", 0, polled=2) == 20
+    # Only the first schedule is spread
+    assert schedule(coordinator, "SN1", 0, polled=2) == 40
+
+
+async def test_write_polls_fast_for_a_while(hass, coordinator):
+    now = hass.loop.time()
+    for _ in range(3):
+        schedule(coordinator, "SN1", now)
+    coordinator.async_note_write("SN1")
+    assert coordinator._next_poll["SN1"] - now == pytest.approx(10, abs=1)
+    assert schedule(coordinator, "SN1", now) == 10
+    assert schedule(coordinator, "SN1", now + FAST_POLL_WINDOW + 1) == 20
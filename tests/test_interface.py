@@ -0,0 +1,188 @@
+"""Tests for the serial interface, run against the simulated hub."""
+
+import asyncio
+import socket
+
+import pytest
+from homeassistant.components.climate.const import HVACMode
+
+from custom_components.aprilaire_thermostat.aprilair_serial_interface import (
+    AprilaireThermostatSerialInterface,
+)
+from custom_components.aprilaire_thermostat.simulator import AprilaireSimulator
+
+
+def record_commands(simulator):
+    """Return the list the simulator appends every command it answers to."""
+    commands = []
+    handle = simulator.handle
+
+    def recording(command):
+        commands.append(command.strip())
+        return handle(command)
+
+    simulator.handle = recording
+    return commands
+
+
+async def connect(simulator, **kwargs):
+    interface = AprilaireThermostatSerialInterface("simulator", **kwargs)
+    interface.attach(*await simulator.open_connection())
+    return interface
+
+
+async def open_scripted_bus():
+    """Return an interface and the hub end of its stream, for replies the simulator never sends."""
+    client, hub = socket.socketpair()
+    interface = AprilaireThermostatSerialInterface("scripted")
+    interface.attach(*await asyncio.open_connection(sock=client))
+    return interface, await asyncio.open_connection(sock=hub)
+
+
+async def read_commands(reader, count):
+    return [(await reader.readuntil(b"\r")).decode().strip() for _ in range(count)]
+
+
+@pytest.fixture
+async def simulator():
+    simulator = AprilaireSimulator(3, latency=0.001)
+    yield simulator
+    await simulator.close()
+
+
+async def test_pipelined_reads(simulator):
+    for i, zone in enumerate(simulator.zones.values()):
+        zone.temperature = 70 + i
+    interface = await connect(simulator)
+    try:
+        commands = [f"{sn}{field}?" for sn in simulator.zones for field in ("T", "M", "SH")]
+        replies = await interface.transaction(commands)
+        assert replies == [simulator.status_line(command[:3], command[3:-1]) for command in commands]
+        temperatures = await asyncio.gather(*(interface.get_temperature(sn) for sn in simulator.zones))
+        assert temperatures == [70.0, 71.0, 72.0]
+    finally:
+        interface.close()
+
+
+async def test_replies_matched_by_address_and_field():
+    interface, (reader, writer) = await open_scripted_bus()
+    try:
+        task = asyncio.ensure_future(interface.transaction(["SN1T?", "SN1M?", "SN2T?"], timeout=1))
+        # Batches take one command per thermostat in turn
+        assert await read_commands(reader, 3) == ["SN1T?", "SN2T?", "SN1M?"]
+        writer.write(b"SN2 T=68F\rSN1 M=HEAT\rSN1 T=71F\r")
+        assert await task == ["SN1 T=71F", "SN1 M=HEAT", "SN2 T=68F"]
+    finally:
+        interface.close()
+        writer.close()
+
+
+async def test_late_reply_is_not_taken_for_the_next_one():
+    interface, (reader, writer) = await open_scripted_bus()
+    updates = []
+    interface.add_listener(lambda *update: updates.append(update))
+    try:
+        assert await interface.transaction(["SN1T?"], timeout=0.05) == [""]
+        task = asyncio.ensure_future(interface.transaction(["SN1M?"], timeout=1))
+        assert await read_commands(reader, 2) == ["SN1T?", "SN1M?"]
+        writer.write(b"SN1 T=70F\rSN1 M=COOL\r")
+        assert await task == ["SN1 M=COOL"]
+        # The late line is kept as an update instead of being dropped
+        assert updates == [("SN1", "temperature", 70.0)]
+    finally:
+        interface.close()
+        writer.close()
+
+
+async def test_unsolicited_line_during_batch(simulator):
+    interface = await connect(simulator)
+    updates = []
+    interface.add_listener(lambda *update: updates.append(update))
+    try:
+        simulator.zones["SN2"].mode = "HEAT"
+        task = asyncio.ensure_future(interface.transaction(["SN1T?", "SN1M?"]))
+        simulator.broadcast("SN2", "M")
+        assert await task == [simulator.status_line("SN1", "T"), simulator.status_line("SN1", "M")]
+        assert updates == [("SN2", "mode", HVACMode.HEAT)]
+    finally:
+        interface.close()
+
+
+async def test_write_burst_is_coalesced(simulator):
+    commands = record_commands(simulator)
+    interface = await connect(simulator, write_debounce=0.05)
+    try:
+        await asyncio.gather(*(interface.set_setpoint("SN1", HVACMode.HEAT, value) for value in (60, 61, 62)))
+        assert simulator.zones["SN1"].setpoint_heat == 62
+        assert commands == ["SN1SH=62"]
+        assert interface.metrics.writes_coalesced == 2
+    finally:
+        interface.close()
+
+
+async def test_confirmed_write_is_suppressed(simulator):
+    commands = record_commands(simulator)
+    interface = await connect(simulator, write_debounce=0)
+    try:
+        await interface.set_mode("SN1", HVACMode.HEAT)
+        await interface.set_mode("SN1", HVACMode.HEAT)
+        assert await interface.write_many([("SN1", "M", "H", HVACMode.HEAT)]) == {("SN1", "M"): HVACMode.HEAT}
+        assert commands == ["SN1M=H"]
+        assert interface.metrics.writes_suppressed == 2
+    finally:
+        interface.close()
+
+
+@pytest.mark.parametrize("echo", ["none", "stale"])
+async def test_unconfirmed_write_is_verified_and_retried(simulator, echo):
+    commands = record_commands(simulator)
+    handle = simulator.handle
+    dropped = []
+
+    def drop_first_write(command):
+        if command.startswith("SN1SC=") and not dropped:
+            dropped.append(command)
+            commands.append(command.strip())
+            return [simulator.status_line("SN1", "SC")] if echo == "stale" else []
+        return handle(command)
+
+    simulator.handle = drop_first_write
+    interface = await connect(simulator, write_debounce=0)
+    updates = []
+    interface.add_listener(lambda *update: updates.append(update))
+    try:
+        await interface.set_setpoint("SN1", HVACMode.COOL, 78)
+        assert simulator.zones["SN1"].setpoint_cool == 78
+        assert commands == ["SN1SC=78", "SN1SC?", "SN1SC=78"]
+        assert interface.metrics.write_verifies == 1
+        assert interface.metrics.write_retries == 1
+        assert updates[-1] == ("SN1", "setpoint_cool", 78.0)
+    finally:
+        interface.close()
+
+
+async def test_reconnect_after_drop(simulator, socket_enabled):
+    port = await simulator.start_tcp()
+    interface = AprilaireThermostatSerialInterface(f"tcp://127.0.0.1:{port}")
+    await interface.connect()
+    interface.thermostats = list(simulator.zones)
+    interface.start_monitor()
+    changes = []
+    reconnected = asyncio.Event()
+
+    def on_connection(connected):
+        changes.append(connected)
+        if connected:
+            reconnected.set()
+
+    interface.add_connection_listener(on_connection)
+    try:
+        assert await interface.get_temperature("SN1") == 70.0
+        simulator.drop_clients()
+        # The first read after the drop finds the stream closed and wakes the monitor
+        assert await interface.get_temperature("SN1") is None
+        await asyncio.wait_for(reconnected.wait(), 5)
+        assert changes == [False, True]
+        assert await interface.get_temperature("SN1") == 70.0
+    finally:
+        interface.close()
@@ -0,0 +1,90 @@
+"""Tests for the protocol decoder."""
+
+import pytest
+from homeassistant.components.climate.const import HVACAction, HVACMode
+
+from custom_components.aprilaire_thermostat.protocol import (
+    RELAY_BIT,
+    ReplyParser,
+    encode,
+    parse_reply,
+)
+
+
+@pytest.mark.parametrize(
+    ("line", "relays", "action"),
+    [
+        (b"SN1 G+Y1-W1+Y2-W2-B+O-", ("G", "W1", "B"), HVACAction.HEATING),
+        (b"SN1 G+Y1+W1-Y2-W2-B+O-", ("G", "Y1", "B"), HVACAction.COOLING),
+        (b"SN1 G+Y1-W1-Y2-W2-B-O+", ("G", "O"), HVACAction.FAN),
+        (b"SN1 G-Y1-W1-Y2-W2-B+O-", ("B",), HVACAction.OFF),
+    ],
+)
+def test_relay_state(line, relays, action):
+    reply = parse_reply(line)
+    assert (reply.address, reply.field, reply.value) == ("SN1", "H", action)
+    assert reply.relays == sum(RELAY_BIT[name] for name in relays)
+
+
+@pytest.mark.parametrize(
+    ("line", "field", "value"),
+    [
+        (b"SN1 T=72F", "T", 72.0),
+        (b"SN1 SH=68", "SH", 68.0),
+        (b"SN1 SC = 75", "SC", 75.0),
+        (b"SN1 M=COOL", "M", HVACMode.COOL),
+        (b"SN1 M=AUTO", "M", HVACMode.HEAT_COOL),
+        (b"SN1 F=AUTO", "F", "AUTO"),
+    ],
+)
+def test_field_values(line, field, value):
+    reply = parse_reply(line)
+    assert (reply.address, reply.field, reply.value) == ("SN1", field, value)
+
+
+def test_name_and_bare_address():
+    reply = parse_reply(b"SN2Zone2")
+    assert (reply.address, reply.field, reply.value) == ("SN2", "NAME", "Zone2")
+    reply = parse_reply(b" SN3 ")
+    assert (reply.address, reply.field, reply.value) == ("SN3", None, None)
+
+
+@pytest.mark.parametrize("line", [b"SN1 T=hot", b"SN1 SH=", b"SN1 M=SIDEWAYS"])
+def test_bad_values(line):
+    reply = parse_reply(line)
+    assert reply.address == "SN1"
+    assert reply.field == line[4:].split(b"=")[0].decode()
+    assert reply.value is None
+
+
+@pytest.mark.parametrize("line", [b"", b"garbage", b"T=70F"])
+def test_not_a_reply(line):
+    assert parse_reply(line) is None
+
+
+def test_parse_in_place():
+    buffer = bytearray(b"SN1 T=70F\rSN2 M=HEAT\r")
+    reply = parse_reply(buffer, 10, len(buffer) - 1)
+    assert (reply.address, reply.field, reply.value) == ("SN2", "M", HVACMode.HEAT)
+
+
+def test_parser_across_chunks():
+    parser = ReplyParser()
+    assert parser.feed(b"SN1 T=7") == []
+    lines = parser.feed(b"0F\r\rSN1 G-Y1-W1-Y2-W2-B+O-\rSN2")
+    assert [text for text, _ in lines] == ["SN1 T=70F", "SN1 G-Y1-W1-Y2-W2-B+O-"]
+    assert lines[0][1].value == 70.0
+    assert lines[1][1].value == HVACAction.OFF
+    assert [(text, reply.field) for text, reply in parser.flush()] == [("SN2", None)]
+    assert parser.flush() == []
+
+
+def test_parser_keeps_unparsable_lines():
+    lines = ReplyParser().feed(b"OK\r")
+    assert lines == [("OK", None)]
+
+
+def test_encode():
+    assert encode("SN1", "T") == "SN1T?"
+    assert encode("SN1", "SH", 70) == "SN1SH=70"
+    assert encode("SN1", "M", "C") == "SN1M=C"
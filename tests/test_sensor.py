@@ -0,0 +1,9 @@
+"""Tests for the zone and bus sensors."""
+
+
+async def test_each_hub_has_its_own_bus_sensors(hass, setup_entry):
+    await setup_entry({"port": "/dev/ttyUSB0"})
+    await setup_entry({"port": "/dev/ttyUSB1"})
+    for port in ("dev_ttyusb0", "dev_ttyusb1"):
+        assert hass.states.get(f"sensor.aprilaire_bus_commands_{port}")
+        assert hass.states.get(f"binary_sensor.aprilaire_connection_{port}").state == "on"
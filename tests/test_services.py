@@ -0,0 +1,33 @@
+"""Tests for the bulk_set service."""
+
+from homeassistant.util.unit_system import US_CUSTOMARY_SYSTEM
+
+from custom_components.aprilaire_thermostat.const import DOMAIN, SERVICE_BULK_SET
+
+SN1 = "climate.aprilaire_thermostat_sn1_zone1"
+SN2 = "climate.aprilaire_thermostat_sn2_zone2"
+
+
+async def test_bulk_set_reports_each_zone(hass, simulator, setup_entry):
+    hass.config.units = US_CUSTOMARY_SYSTEM
+    await setup_entry()
+    handle = simulator.handle
+
+    def refuse_sn2_cool_setpoint(command):
+        if command.startswith("SN2SC="):
+            return [simulator.status_line("SN2", "SC")]
+        return handle(command)
+
+    simulator.handle = refuse_sn2_cool_setpoint
+    response = await hass.services.async_call(
+        DOMAIN, SERVICE_BULK_SET,
+        {"entity_id": [SN1, SN2, "climate.elsewhere"], "hvac_mode": "cool", "cool_setpoint": 80},
+        blocking=True, return_response=True,
+    )
+    assert response["zones"][SN1] == {"success": True, "failed": []}
+    assert response["zones"][SN2] == {"success": False, "failed": ["cool_setpoint"]}
+    assert response["zones"]["climate.elsewhere"]["success"] is False
+    assert simulator.zones["SN2"].mode == "COOL"
+    await hass.async_block_till_done()
+    assert hass.states.get(SN1).attributes["temperature"] == 80
+    assert hass.states.get(SN2).attributes["temperature"] == 75
@@ -0,0 +1,52 @@
+"""End-to-end tests of the native transports against the simulated hub."""
+
+import pytest
+from homeassistant.components.climate.const import HVACMode
+
+from custom_components.aprilaire_thermostat.aprilair_serial_interface import (
+    AprilaireThermostatSerialInterface,
+)
+from custom_components.aprilaire_thermostat.simulator import AprilaireSimulator
+from custom_components.aprilaire_thermostat.transport import transport_url, TRANSPORT_TCP, TRANSPORT_TTY
+
+
+@pytest.fixture
+async def simulator():
+    simulator = AprilaireSimulator(2, latency=0.001)
+    yield simulator
+    await simulator.close()
+
+
+async def poll_and_write(interface, simulator):
+    """Discover, poll every zone and change a setting, as the coordinator and an entity would."""
+    assert await interface.query_thermostats() == (["SN1", "SN2"], ["Zone1", "Zone2"])
+    for sn in ("SN1", "SN2"):
+        assert await interface.get_temperature(sn) == 70.0
+        assert await interface.get_mode(sn) == HVACMode.COOL
+        assert await interface.get_setpoint(sn, HVACMode.HEAT) == 68.0
+    await interface.set_setpoint("SN2", HVACMode.COOL, 77)
+    assert simulator.zones["SN2"].setpoint_cool == 77
+    assert await interface.get_setpoint("SN2", HVACMode.COOL, force=True) == 77.0
+
+
+async def test_tty(simulator):
+    interface = AprilaireThermostatSerialInterface(
+        transport_url(TRANSPORT_TTY, simulator.open_pty()), write_debounce=0
+    )
+    await interface.connect()
+    try:
+        await poll_and_write(interface, simulator)
+    finally:
+        interface.close()
+
+
+async def test_tcp(simulator, socket_enabled):
+    port = await simulator.start_tcp()
+    interface = AprilaireThermostatSerialInterface(
+        transport_url(TRANSPORT_TCP, f"127.0.0.1:{port}"), write_debounce=0
+    )
+    await interface.connect()
+    try:
+        await poll_and_write(interface, simulator)
+    finally:
+        interface.close()